@@ -1,9 +1,73 @@
-from typing import Union, Dict
+import asyncio
+import inspect
+import threading
+import weakref
+from typing import Union, Dict, Callable, Optional
 from autogen import ConversableAgent, Agent
-from zep_cloud.client import Zep
+from ollama import AsyncClient, Client
+from zep_cloud.client import Zep, AsyncZep
 from zep_cloud import Message, Memory
 
 
+# Marks that no prefetched memory context is waiting for the next turn
+_NOT_PREFETCHED = object()
+
+# Ollama reports durations in nanoseconds
+NS_PER_SECOND = 1e9
+
+# Sync Ollama clients shared per host, so turns reuse pooled connections
+_ollama_clients = {}
+_ollama_clients_lock = threading.Lock()
+
+
+def _ollama_client(host):
+    """Return the shared sync Ollama client for host."""
+    with _ollama_clients_lock:
+        client = _ollama_clients.get(host)
+        if client is None:
+            client = _ollama_clients[host] = Client(host=host)
+        return client
+
+
+# Async Ollama clients shared per event loop and host (httpx async clients are bound to their loop)
+_async_ollama_clients = weakref.WeakKeyDictionary()
+
+
+def _async_ollama_client(host):
+    """Return the async Ollama client shared by every agent on the running loop."""
+    clients = _async_ollama_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(host)
+    if client is None:
+        client = clients[host] = AsyncClient(host=host)
+    return client
+
+
+class ThinkBudget:
+    """Count streamed chunks (about one token each) inside the first <think> block."""
+
+    def __init__(self, budget: Optional[int]):
+        self.budget = budget
+        self.inside = False
+        self.chunks = 0
+        self._tail = ""
+
+    def exceeded(self, chunk: str) -> bool:
+        """Feed a streamed chunk; True once the think block is over budget."""
+        window = self._tail + chunk
+        if not self.inside and "<think>" in window:
+            self.inside = True
+            window = window[window.index("<think>") + len("<think>"):]
+        if self.inside:
+            if "</think>" in window:
+                self.inside = False
+                # Only the first think block counts
+                self.budget = None
+            else:
+                self.chunks += 1
+        self._tail = window[-len("</think>"):]
+        return self.budget is not None and self.chunks > self.budget
+
+
 class ZepConversableAgent(ConversableAgent):
     """A custom ConversableAgent that integrates with Zep for long-term memory."""
     
@@ -13,10 +77,11 @@ class ZepConversableAgent(ConversableAgent):
         system_message: str,
         llm_config: dict,
         zep_session_id: str,
-        zep_client: Zep,
+        zep_client: Union[Zep, AsyncZep],
         min_fact_rating: float,
         function_map=None,
         human_input_mode: str = "NEVER",
+        generation_policy: Optional[dict] = None,
     ):
         # Replace spaces with underscores in the name to satisfy Autogen's validation
         modified_name = name.replace(" ", "_")
@@ -34,6 +99,17 @@ class ZepConversableAgent(ConversableAgent):
         self.zep_session_id = zep_session_id
         self.zep_client = zep_client
         self.min_fact_rating = min_fact_rating
+        self.is_async = inspect.iscoroutinefunction(zep_client.memory.add)
+        # Pending assistant-message writes when running on an AsyncZep client
+        self._pending_zep_writes = set()
+        # Receives streamed reply chunks during an async turn, see a_stream_turn
+        self._stream_callback: Optional[Callable[[str], None]] = None
+        # Memory context fetched ahead of the next turn, see use_prefetched_context
+        self._prefetched_context = _NOT_PREFETCHED
+        # Output limits from llm_config.generation_policies; None uses autogen's Ollama client
+        self.generation_policy = generation_policy
+        # Token counts and timings reported by Ollama for the last streamed reply
+        self.last_generation_stats: Optional[dict] = None
         # Store the original system message as we will update it with relevant facts from Zep
         self.original_system_message = system_message
         self.register_hook(
@@ -42,6 +118,12 @@ class ZepConversableAgent(ConversableAgent):
         # Note: Persisting user messages needs to happen *before* the agent
         # processes them to fetch relevant facts. We'll handle this outside
         # the hook based on Streamlit input.
+        self.register_reply([Agent, None], ZepConversableAgent._generate_ollama_reply)
+        self.register_reply(
+            [Agent, None],
+            ZepConversableAgent._a_stream_ollama_reply,
+            ignore_async_in_sync_chat=True,
+        )
     
     def _zep_persist_assistant_messages(
         self,
@@ -61,17 +143,36 @@ class ZepConversableAgent(ConversableAgent):
                 zep_message = Message(
                     role_type="assistant", role=self.display_name, content=content
                 )
-                self.zep_client.memory.add(
-                    session_id=self.zep_session_id, messages=[zep_message]
-                )
+                if self.is_async:
+                    # Hooks are synchronous, so schedule the write on the running loop
+                    task = asyncio.get_running_loop().create_task(
+                        self.zep_client.memory.add(
+                            session_id=self.zep_session_id, messages=[zep_message]
+                        )
+                    )
+                    self._pending_zep_writes.add(task)
+                    task.add_done_callback(self._pending_zep_writes.discard)
+                else:
+                    self.zep_client.memory.add(
+                        session_id=self.zep_session_id, messages=[zep_message]
+                    )
         return message
     
+    def use_prefetched_context(self, memory_context: Optional[str]):
+        """Use memory context fetched ahead of time for the next turn instead of calling Zep."""
+        self._prefetched_context = memory_context
+
     def _zep_fetch_and_update_system_message(self):
         """Fetch facts and update system message."""
-        memory: Memory = self.zep_client.memory.get(
-            self.zep_session_id, min_rating=self.min_fact_rating
-        )
-        context = memory.context or "No specific facts recalled."
+        if self._prefetched_context is not _NOT_PREFETCHED:
+            context = self._prefetched_context
+            self._prefetched_context = _NOT_PREFETCHED
+        else:
+            memory: Memory = self.zep_client.memory.get(
+                self.zep_session_id, min_rating=self.min_fact_rating
+            )
+            context = memory.context
+        context = context or "No specific facts recalled."
         
         # Update the system message for the next inference
         self.update_system_message(
@@ -89,4 +190,187 @@ class ZepConversableAgent(ConversableAgent):
             )
             self.zep_client.memory.add(
                 session_id=self.zep_session_id, messages=[zep_message]
-            )
\ No newline at end of file
+            )
+
+    async def _a_zep_fetch_and_update_system_message(self):
+        """Async version of _zep_fetch_and_update_system_message."""
+        memory: Memory = await self.zep_client.memory.get(
+            self.zep_session_id, min_rating=self.min_fact_rating
+        )
+        context = memory.context or "No specific facts recalled."
+
+        self.update_system_message(
+            self.original_system_message
+            + f"\n\n## MEMORY CONTEXT:\n{context}"
+        )
+
+    async def _a_zep_persist_user_message(self, user_content: str, user_name: str = "User"):
+        """Async version of _zep_persist_user_message."""
+        if user_content:
+            zep_message = Message(
+                role_type="user",
+                role=user_name,
+                content=user_content,
+            )
+            await self.zep_client.memory.add(
+                session_id=self.zep_session_id, messages=[zep_message]
+            )
+
+    async def a_flush_zep_writes(self):
+        """Wait for scheduled assistant-message writes to reach Zep."""
+        if self._pending_zep_writes:
+            await asyncio.gather(*self._pending_zep_writes)
+
+    def _ollama_chat_args(self, messages):
+        """Build the Ollama host and streaming chat arguments, applying the generation policy."""
+        llm = self.llm_config["config_list"][0]
+        policy = self.generation_policy or {}
+
+        options = {}
+        if policy.get("max_tokens"):
+            options["num_predict"] = policy["max_tokens"]
+        if policy.get("stop"):
+            options["stop"] = list(policy["stop"])
+
+        kwargs = {
+            "model": llm["model"],
+            "messages": [
+                {"role": m["role"], "content": m.get("content") or ""}
+                for m in self._oai_system_message + messages
+            ],
+            "stream": True,
+            "options": options or None,
+        }
+        if policy.get("disable_reasoning"):
+            kwargs["think"] = False
+        # autogen validates client_host into a URL object; ollama expects a string
+        host = llm.get("client_host")
+        return (str(host) if host else None), kwargs
+
+    def _record_generation_stats(self, chunk, chunk_count):
+        """
+        Keep Ollama's token counts and timings from the final chunk of a streamed
+        reply: load_seconds is the model load, inference_seconds the prompt
+        evaluation and generation.
+        """
+        self.last_generation_stats = {
+            "prompt_tokens": chunk.get("prompt_eval_count"),
+            "completion_tokens": chunk.get("eval_count") or chunk_count,
+            "load_seconds": (chunk.get("load_duration") or 0) / NS_PER_SECOND,
+            "inference_seconds": (
+                (chunk.get("prompt_eval_duration") or 0) + (chunk.get("eval_duration") or 0)
+            ) / NS_PER_SECOND,
+        }
+
+    def _stream_chat(self, client, kwargs, think_budget):
+        """
+        Stream one chat from Ollama.
+
+        Returns:
+            str: The reply content, or None if the think block exceeded
+                think_budget and generation was aborted
+        """
+        budget = ThinkBudget(think_budget)
+        stream = client.chat(**kwargs)
+
+        chunks = []
+        for chunk in stream:
+            content = chunk["message"]["content"] or ""
+            if budget.exceeded(content):
+                # Closing the stream drops the connection, which stops generation in Ollama
+                stream.close()
+                return None
+            chunks.append(content)
+            if chunk.get("done"):
+                self._record_generation_stats(chunk, len(chunks))
+
+        return "".join(chunks)
+
+    def _generate_ollama_reply(
+        self,
+        messages=None,
+        sender: Optional[Agent] = None,
+        config=None,
+    ):
+        """
+        Generate the reply from Ollama under the generation policy, if one is set.
+        Generation is aborted once the think block exceeds the policy's think_budget,
+        and the reply is generated again with reasoning switched off.
+        """
+        if self.generation_policy is None:
+            return False, None
+
+        self.last_generation_stats = None
+        host, kwargs = self._ollama_chat_args(messages)
+        client = _ollama_client(host)
+        content = self._stream_chat(client, kwargs, self.generation_policy.get("think_budget"))
+        if content is None:
+            content = self._stream_chat(client, {**kwargs, "think": False}, None)
+        return True, content
+
+    async def _a_stream_chat(self, client, kwargs, think_budget):
+        """Async version of _stream_chat that also passes chunks to the stream callback."""
+        budget = ThinkBudget(think_budget)
+        stream = await client.chat(**kwargs)
+
+        chunks = []
+        async for chunk in stream:
+            content = chunk["message"]["content"] or ""
+            if budget.exceeded(content):
+                await stream.aclose()
+                return None
+            if content:
+                chunks.append(content)
+                self._stream_callback(content)
+            if chunk.get("done"):
+                self._record_generation_stats(chunk, len(chunks))
+
+        return "".join(chunks)
+
+    async def _a_stream_ollama_reply(
+        self,
+        messages=None,
+        sender: Optional[Agent] = None,
+        config=None,
+    ):
+        """
+        Stream the reply from Ollama when a stream callback is set.
+        Otherwise defer to the regular autogen reply functions.
+        As in _generate_ollama_reply, a reply whose think block exceeds the
+        budget is generated again with reasoning switched off.
+        """
+        if self._stream_callback is None:
+            return False, None
+
+        self.last_generation_stats = None
+        host, kwargs = self._ollama_chat_args(messages)
+        client = _async_ollama_client(host)
+        content = await self._a_stream_chat(
+            client, kwargs, (self.generation_policy or {}).get("think_budget")
+        )
+        if content is None:
+            # Close the abandoned think block for the callback's think filter
+            self._stream_callback("</think>")
+            content = await self._a_stream_chat(client, {**kwargs, "think": False}, None)
+        return True, content
+
+    async def a_stream_turn(self, user: Agent, message: str, on_chunk: Callable[[str], None]):
+        """
+        Run a single async turn with user, streaming reply chunks to on_chunk.
+
+        Returns:
+            str: The full reply content
+        """
+        self._stream_callback = on_chunk
+        try:
+            await user.a_initiate_chat(
+                recipient=self,
+                message=message,
+                max_turns=1,
+                clear_history=False,
+                silent=True,
+            )
+        finally:
+            self._stream_callback = None
+        await self.a_flush_zep_writes()
+        return user.last_message(self).get("content", "")
@@ -1,32 +1,117 @@
 # Import necessary libraries
-import re
+import os
+import time
 import uuid
+from contextlib import nullcontext
 from datetime import datetime
 from autogen import UserProxyAgent
+from chat_history import ChatHistory
 from zep_cloud.client import Zep
-from zep_cloud import FactRatingExamples, FactRatingInstruction, Message
-from llm_config import config_list
-from prompt import agent_system_message, customer_support_system_message
+from llm_config import config_list, generation_policies
+from llm_residency import ModelResidency
+from prefetch import Prefetcher
+from profiling import profile_turn, should_profile
 from agent import ZepConversableAgent
-from util import generate_user_id, load_support_knowledge_base
+from support import (
+    TICKET_STATUSES,
+    WELCOME_MESSAGES,
+    attach_to_ticket,
+    build_system_message,
+    create_ticket,
+    ensure_user_session,
+    list_user_tickets,
+    run_turn,
+    set_ticket_status,
+)
+from resilient import ResilientZep
+from singleflight import SingleFlightZep
+from traffic import RecordingZep, TraceRecorder
+from identity import IdentityDirectory, default_directory_path
+from ticket_index import TicketIndex
+from transcript_export import iter_ticket_sessions
+from util import enable_knowledge_base_hot_reload
+from worker_pool import TurnPool
 import streamlit as st
 
 
 # Define zep as a global variable to be initialized later
 zep = None
 
+# Number of worker processes for LLM turns; 0 runs turns in the Streamlit process
+TURN_WORKERS = int(os.environ.get("TURN_WORKERS", "0"))
+
+# Earlier messages loaded per click on "Load earlier messages"
+HISTORY_PAGE_SIZE = 20
+
+# Watch support_kb.json for edits and apply them without a restart
+if os.environ.get("KB_HOT_RELOAD"):
+    enable_knowledge_base_hot_reload()
+
+
+@st.cache_resource
+def get_trace_recorder():
+    """Open the traffic capture file when TRAFFIC_CAPTURE is set (once per process)."""
+    path = os.environ.get("TRAFFIC_CAPTURE")
+    return TraceRecorder(path) if path else None
+
+
+@st.cache_resource
+def get_zep_client(api_key):
+    """
+    Create one Zep client per API key, shared by all sessions so concurrent
+    reads coalesce and latency statistics are learned across sessions.
+    """
+    client = SingleFlightZep(ResilientZep(Zep(api_key=api_key)))
+    recorder = get_trace_recorder()
+    return RecordingZep(client, recorder) if recorder else client
+
 
 def initialize_zep_client(api_key):
     """Initialize the Zep client with the provided API key."""
     global zep
     try:
-        zep = Zep(api_key=api_key)
+        zep = get_zep_client(api_key)
         return True
     except Exception as e:
         st.error(f"Failed to initialize Zep Client: {e}")
         return False
 
 
+@st.cache_resource
+def get_turn_pool(api_key):
+    """Start the process pool shared by all Streamlit sessions (once per API key)."""
+    return TurnPool(api_key, workers=TURN_WORKERS, record_zep_calls=get_trace_recorder() is not None)
+
+
+@st.cache_resource
+def get_model_residency():
+    """Preload the Ollama model and keep it resident (once per process)."""
+    return ModelResidency(config_list[0]).start()
+
+
+@st.cache_resource
+def get_prefetcher(api_key):
+    """Create the context prefetcher shared by all Streamlit sessions (once per API key)."""
+    return Prefetcher(get_zep_client(api_key), min_fact_rating=0.7)
+
+
+@st.cache_resource
+def get_identity_directory():
+    """Open the durable user identity directory (once per process)."""
+    return IdentityDirectory(default_directory_path())
+
+
+@st.cache_resource
+def get_ticket_index(api_key):
+    """Build the near-duplicate ticket index from the tickets in Zep (once per API key)."""
+    index = TicketIndex()
+    try:
+        index.load_sessions(iter_ticket_sessions(get_zep_client(api_key)))
+    except Exception as e:
+        print(f"Failed to load tickets into the duplicate index: {e}")
+    return index
+
+
 def initialize_session(first_name, last_name, is_support_agent=False, ticket_id=None):
     """Initialize the session state and Zep connection."""
     # Check if we have a valid Zep client
@@ -36,8 +121,9 @@ def initialize_session(first_name, last_name, is_support_agent=False, ticket_id=
         return
 
     if "zep_session_id" not in st.session_state or ticket_id:
-        # Generate unique identifiers
-        user_id = generate_user_id(first_name, last_name)
+        # Look up the durable user ID for this person
+        directory = get_identity_directory()
+        user_id, user_known = directory.resolve(first_name, last_name)
         
         # If this is for a support ticket, use the ticket ID as session ID
         session_id = ticket_id if ticket_id else str(uuid.uuid4())
@@ -46,48 +132,27 @@ def initialize_session(first_name, last_name, is_support_agent=False, ticket_id=
         st.session_state.zep_session_id = session_id
         st.session_state.zep_user_id = user_id
         st.session_state.chat_initialized = False
-        st.session_state.messages = []  # Store chat history for display
+        if "messages" in st.session_state:
+            # Drop the spilled rows of the history being replaced
+            st.session_state.messages.clear()
+        st.session_state.messages = ChatHistory()  # Store chat history for display
+        st.session_state.history_shown = 0
         st.session_state.is_support_mode = is_support_agent
         
         if ticket_id:
             st.session_state.ticket_id = ticket_id
 
         try:
-            # Define fact rating instructions
-            fact_rating_instruction = """Rate facts by relevance and utility. Highly relevant 
-            facts directly impact the user's current needs or represent core preferences that 
-            affect multiple interactions. Low relevance facts are incidental details that 
-            rarely influence future conversations or decisions."""
-
-            fact_rating_examples = FactRatingExamples(
-                high="The user has had multiple issues with their account login in the past month.",
-                medium="The user prefers email communication over phone calls.",
-                low="The user mentioned they were using Chrome browser yesterday.",
-            )
-
-            # Attempt to add user
-            user_exists = False
-            try:
-                # Try to get user
-                zep.user.get(st.session_state.zep_user_id)
-                user_exists = True
-            except Exception:
-                # User doesn't exist, create a new one
-                zep.user.add(
-                    first_name=first_name,
-                    last_name=last_name,
-                    user_id=st.session_state.zep_user_id,
-                    fact_rating_instruction=FactRatingInstruction(
-                        instruction=fact_rating_instruction,
-                        examples=fact_rating_examples,
-                    ),
-                )
-
-            # Add session for the user (whether new or existing)
-            zep.memory.add_session(
-                user_id=st.session_state.zep_user_id,
-                session_id=st.session_state.zep_session_id,
+            # Create the user if needed and add a session for it
+            user_exists = ensure_user_session(
+                zep,
+                st.session_state.zep_user_id,
+                first_name,
+                last_name,
+                st.session_state.zep_session_id,
+                user_known=user_known,
             )
+            directory.mark_known(first_name, last_name)
 
             # Show appropriate message
             if user_exists:
@@ -97,17 +162,20 @@ def initialize_session(first_name, last_name, is_support_agent=False, ticket_id=
 
             st.session_state.chat_initialized = True
             st.sidebar.success("Zep user/session initialized successfully.")
+
+            # Warm the model and the memory context before the first message arrives
+            get_model_residency().ensure_warm()
+            get_prefetcher(st.session_state.zep_api_key).prefetch(
+                st.session_state.zep_session_id, is_ticket=bool(ticket_id)
+            )
+            # Only the first turn may use it; later turns must see their own saved messages
+            st.session_state.use_prefetched_context = True
             
             # Different welcome message for support mode
-            if is_support_agent:
-                welcome_msg = "Welcome to our Customer Support! 🎫 How can I assist you today?"
-            else:
-                welcome_msg = "Welcome! 😊 How can I assist you today?"
-                
             st.session_state.messages.append(
                 {
                     "role": "assistant",
-                    "content": welcome_msg,
+                    "content": WELCOME_MESSAGES[is_support_agent],
                 }
             )
 
@@ -120,15 +188,10 @@ def initialize_session(first_name, last_name, is_support_agent=False, ticket_id=
 def create_agents(is_support_mode=False):
     """Create and configure the conversational agents."""
     if st.session_state.chat_initialized:
-        # Use the appropriate system message based on mode
-        system_message = customer_support_system_message if is_support_mode else agent_system_message
-        
-        # Load knowledge base for customer support
-        if is_support_mode:
-            kb = load_support_knowledge_base()
-            # Enhance system message with knowledge base if in support mode
-            system_message = f"{system_message}\n\n## KNOWLEDGE BASE:\n{kb}"
-        
+        # Use the appropriate system message based on mode, with the
+        # knowledge base included in support mode
+        system_message = build_system_message(is_support_mode)
+
         # Create the autogen agent with Zep memory
         agent = ZepConversableAgent(
             name="ZEP SUPPORT" if is_support_mode else "ZEP AGENT",
@@ -139,6 +202,7 @@ def create_agents(is_support_mode=False):
             min_fact_rating=0.7,
             function_map=None,
             human_input_mode="NEVER",
+            generation_policy=generation_policies["support" if is_support_mode else "assistant"],
         )
 
         # Create UserProxy agent
@@ -154,78 +218,13 @@ def create_agents(is_support_mode=False):
     return None, None
 
 
-def create_support_ticket(user_id, issue_title, issue_description):
-    """Create a new support ticket and return the ticket ID."""
-    # Generate a ticket ID with timestamp for uniqueness
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    ticket_id = f"TICKET-{timestamp}-{user_id[:5]}"
-    
-    # Store ticket metadata in Zep
-    if zep:
-        metadata = {
-            "ticket_id": ticket_id,
-            "created_at": datetime.now().isoformat(),
-            "status": "open",
-            "issue_title": issue_title,
-            "issue_type": "customer_support",
-        }
-        
-        # Create a new session for this ticket
-        try:
-            # Add session with metadata
-            zep.memory.add_session(
-                user_id=user_id,
-                session_id=ticket_id,
-                metadata=metadata
-            )
-            
-            # Add the initial description as the first message
-            zep.memory.add(
-                session_id=ticket_id,
-                messages=[
-                    Message(
-                        role_type="user",
-                        role=user_id,
-                        content=f"TICKET DESCRIPTION: {issue_description}",
-                    )
-                ]
-            )
-            
-            return ticket_id
-        except Exception as e:
-            st.error(f"Failed to create ticket: {e}")
-            return None
-    return None
-
-
 def get_user_tickets(user_id):
     """Retrieve all support tickets for a user."""
     if not zep:
         return []
         
     try:
-        # List all sessions 
-        sessions = zep.memory.list_sessions()
-        
-        # Filter for support ticket sessions that belong to the user
-        tickets = []
-        for session in sessions:
-            metadata = session.metadata
-            # Check if this session belongs to our user and is a support ticket
-            if (metadata and 
-                metadata.get("user_id") == user_id and 
-                "ticket_id" in metadata and 
-                "issue_type" in metadata and
-                metadata["issue_type"] == "customer_support"):
-                
-                tickets.append({
-                    "ticket_id": metadata["ticket_id"],
-                    "created_at": metadata.get("created_at", "Unknown"),
-                    "status": metadata.get("status", "open"),
-                    "issue_title": metadata.get("issue_title", "Untitled Issue"),
-                })
-        
-        return tickets
+        return list_user_tickets(zep, user_id)
     except Exception as e:
         st.error(f"Failed to retrieve tickets: {e}")
         return []
@@ -233,42 +232,10 @@ def get_user_tickets(user_id):
 
 def create_support_ticket(user_id, issue_title, issue_description):
     """Create a new support ticket and return the ticket ID."""
-    # Generate a ticket ID with timestamp for uniqueness
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    ticket_id = f"TICKET-{timestamp}-{user_id[:5]}"
-    
-    # Store ticket metadata in Zep
     if zep:
-        metadata = {
-            "ticket_id": ticket_id,
-            "created_at": datetime.now().isoformat(),
-            "status": "open",
-            "issue_title": issue_title,
-            "issue_type": "customer_support",
-            "user_id": user_id,  # Add user_id to metadata for filtering
-        }
-        
-        # Create a new session for this ticket
         try:
-            # Add session with metadata
-            zep.memory.add_session(
-                user_id=user_id,
-                session_id=ticket_id,
-                metadata=metadata
-            )
-            
-            # Add the initial description as the first message
-            zep.memory.add(
-                session_id=ticket_id,
-                messages=[
-                    Message(
-                        role_type="user",
-                        role=user_id,
-                        content=f"TICKET DESCRIPTION: {issue_description}",
-                    )
-                ]
-            )
-            
+            ticket_id = create_ticket(zep, user_id, issue_title, issue_description)
+            get_ticket_index(st.session_state.zep_api_key).add(ticket_id, issue_title, issue_description)
             return ticket_id
         except Exception as e:
             st.error(f"Failed to create ticket: {e}")
@@ -276,29 +243,35 @@ def create_support_ticket(user_id, issue_title, issue_description):
     return None
 
 
-def update_ticket_status(ticket_id, new_status):
-    """Update the status of a support ticket."""
+def find_duplicate_tickets(issue_title, issue_description):
+    """Find open tickets that already track the same issue."""
+    return get_ticket_index(st.session_state.zep_api_key).find_duplicates(issue_title, issue_description)
+
+
+def join_existing_ticket(user_id, ticket_id):
+    """Attach the user to an existing ticket instead of opening a new one."""
     if not zep:
         return False
-        
+
     try:
-        # First get the current session to get existing metadata
-        session = zep.memory.get_session(ticket_id)
-        if not session or not session.metadata:
-            return False
-            
-        # Update the status in metadata
-        metadata = session.metadata
-        metadata["status"] = new_status
-        metadata["updated_at"] = datetime.now().isoformat()
-        
-        # Update the session with new metadata
-        zep.memory.update_session(
-            session_id=ticket_id,
-            metadata=metadata
-        )
+        return attach_to_ticket(zep, ticket_id, user_id) is not None
+    except Exception as e:
+        st.error(f"Failed to join ticket: {e}")
+        return False
+
+
+def update_ticket_status(ticket_id, new_status, resolution=None):
+    """Update the status (and optionally the resolution) of a support ticket."""
+    if not zep:
+        return False
         
-        return True
+    try:
+        updated = set_ticket_status(zep, ticket_id, new_status, resolution) is not None
+        if updated:
+            get_ticket_index(st.session_state.zep_api_key).update(
+                ticket_id, status=new_status, resolution=resolution or None
+            )
+        return updated
     except Exception as e:
         st.error(f"Failed to update ticket status: {e}")
         return False
@@ -311,18 +284,35 @@ def handle_conversations(agent, user, prompt):
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Append /no_think token for the backend processing
-    prompt_with_token = f"{prompt} /no_think"
-
     # Store user's full name instead of ID
     user_full_name = f"{st.session_state.get('first_name', '')} {st.session_state.get('last_name', '')}".strip()
 
     # Use proper name if available, otherwise fall back to user ID
     display_name = user_full_name if user_full_name else st.session_state.zep_user_id
 
-    # Persist user message and update system message with facts
-    agent._zep_persist_user_message(prompt, user_name=display_name.upper())
-    agent._zep_fetch_and_update_system_message()
+    # Use the prefetched memory context on the first turn after init, if it is still warm
+    prefetched = None
+    if st.session_state.pop("use_prefetched_context", False):
+        prefetched = get_prefetcher(st.session_state.zep_api_key).take(st.session_state.zep_session_id)
+
+    residency = get_model_residency()
+    was_warm = residency.is_warm()
+    turn_start = time.monotonic()
+    generation = None
+
+    recorder = get_trace_recorder()
+    is_support_mode = st.session_state.get("is_support_mode", False)
+    capture = (
+        recorder.turn(st.session_state.zep_session_id, is_support_mode, prompt)
+        if recorder else nullcontext({})
+    )
+    profile_enabled = should_profile(st.session_state.get("profile_turns", False))
+    # In pool mode the worker profiles the turn; this thread only waits for it
+    profiling = profile_turn(
+        st.session_state.zep_session_id,
+        st.session_state.get("active_ticket"),
+        enabled=profile_enabled and TURN_WORKERS == 0,
+    )
 
     # Generate and display response
     with st.chat_message("assistant"):
@@ -330,25 +320,36 @@ def handle_conversations(agent, user, prompt):
         message_placeholder.markdown("Thinking...")
 
         try:
-            # Initiate chat with single turn
-            user.initiate_chat(
-                recipient=agent,
-                message=prompt_with_token,
-                max_turns=1,
-                clear_history=False,
-            )
-
-            # Extract response from agent
-            full_response = user.last_message(agent).get("content", "...")
-
-            if not full_response or full_response == "...":
-                full_response = "Sorry, I couldn't generate a response."
+            with capture as trace, profiling as profile:
+                # Run the turn in a worker process when the pool is enabled
+                if TURN_WORKERS > 0:
+                    result = get_turn_pool(st.session_state.zep_api_key).run(
+                        st.session_state.zep_session_id,
+                        is_support_mode,
+                        prompt,
+                        display_name.upper(),
+                        prefetched=prefetched,
+                        profile=profile_enabled,
+                        ticket_id=st.session_state.get("active_ticket"),
+                    )
+                    clean_response = result["response"]
+                    profile["path"] = result["profile"]
+                    # The worker made the turn's Zep calls, so they come back with the result
+                    if recorder:
+                        trace["zep_calls"].extend(result["zep_calls"])
+                    generation = trace["llm"] = result["llm"]
+                else:
+                    if prefetched is not None:
+                        agent.use_prefetched_context(prefetched.memory_context)
+                    clean_response = run_turn(agent, user, prompt, display_name.upper())
+                    generation = trace["llm"] = agent.last_generation_stats
 
-            # Remove <think> </think> tags from the response
-            clean_response = re.sub(r'<think>.*?</think>', '', full_response, flags=re.DOTALL).strip()
+            residency.record_turn(time.monotonic() - turn_start, was_warm, generation)
 
             # Display the response
             message_placeholder.markdown(clean_response)
+            if profile["path"]:
+                st.caption(f"Turn profile written to {profile['path']}")
 
             # Add assistant response to display history
             st.session_state.messages.append(
@@ -361,6 +362,20 @@ def handle_conversations(agent, user, prompt):
             raise RuntimeError(error_message) from e
 
 
+def render_chat_history():
+    """Render recent chat messages, with earlier ones loaded a page at a time."""
+    history = st.session_state.messages
+    shown = st.session_state.get("history_shown", 0)
+
+    if history.spilled_count > shown:
+        if st.button(f"Load earlier messages ({history.spilled_count - shown} more)", key="load_earlier"):
+            shown = st.session_state.history_shown = shown + HISTORY_PAGE_SIZE
+
+    for message in history.earlier(shown) + list(history):
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+
 def customer_support_view():
     """Render the customer support portal view."""
     st.title("🎫 Customer Support Portal")
@@ -378,21 +393,50 @@ def customer_support_view():
         issue_title = st.text_input("Issue Title", key="new_ticket_title")
         issue_description = st.text_area("Describe your issue", height=150, key="new_ticket_desc")
         
+        create_anyway = False
         if st.button("Submit Ticket"):
             if not issue_title or not issue_description:
                 st.warning("Please fill out all fields")
             else:
-                ticket_id = create_support_ticket(
-                    st.session_state.zep_user_id, 
-                    issue_title, 
-                    issue_description
-                )
-                if ticket_id:
-                    st.success(f"Ticket created successfully! ID: {ticket_id}")
-                    st.session_state.new_ticket_created = ticket_id
-                    # Reset the form fields
-                    st.session_state.new_ticket_title = ""
-                    st.session_state.new_ticket_desc = ""
+                # Offer an existing incident ticket before opening a new one
+                duplicates = find_duplicate_tickets(issue_title, issue_description)
+                if duplicates:
+                    st.session_state.duplicate_tickets = duplicates
+                else:
+                    create_anyway = True
+
+        duplicates = st.session_state.get("duplicate_tickets")
+        if duplicates:
+            st.info("This looks like an issue we are already working on:")
+            for match in duplicates:
+                st.markdown(f"**{match['ticket_id']}** - {match['issue_title']} ({match['status'].upper()})")
+                if match["resolution"]:
+                    st.markdown(f"Known resolution: {match['resolution']}")
+                if st.button(f"Join {match['ticket_id']}", key=f"join_{match['ticket_id']}"):
+                    if join_existing_ticket(st.session_state.zep_user_id, match["ticket_id"]):
+                        del st.session_state.duplicate_tickets
+                        first_name = st.session_state.get("first_name", "")
+                        last_name = st.session_state.get("last_name", "")
+                        initialize_session(first_name, last_name, is_support_agent=True, ticket_id=match["ticket_id"])
+                        st.session_state.active_ticket = match["ticket_id"]
+                        st.session_state.current_view = "chat"
+                        st.experimental_rerun()
+            if st.button("Create a new ticket anyway"):
+                del st.session_state.duplicate_tickets
+                create_anyway = True
+
+        if create_anyway:
+            ticket_id = create_support_ticket(
+                st.session_state.zep_user_id, 
+                issue_title, 
+                issue_description
+            )
+            if ticket_id:
+                st.success(f"Ticket created successfully! ID: {ticket_id}")
+                st.session_state.new_ticket_created = ticket_id
+                # Reset the form fields
+                st.session_state.new_ticket_title = ""
+                st.session_state.new_ticket_desc = ""
                     
     with tab2:
         st.header("My Support Tickets")
@@ -432,6 +476,12 @@ def customer_support_view():
                 options=[t["ticket_id"] for t in tickets],
                 format_func=lambda x: f"{x} - {next((t['issue_title'] for t in tickets if t['ticket_id'] == x), '')}"
             )
+
+            # Start loading the selected ticket's context before it is opened; every
+            # tab renders on each rerun, so only when the selection changes
+            if st.session_state.get("prefetched_selection") != selected_ticket:
+                get_prefetcher(st.session_state.zep_api_key).prefetch(selected_ticket, is_ticket=True)
+                st.session_state.prefetched_selection = selected_ticket
             
             if st.button("Continue Conversation"):
                 # Get user info from session state
@@ -454,12 +504,13 @@ def customer_support_view():
             
             new_status = st.selectbox(
                 "New Status:", 
-                options=["open", "closed", "resolved", "pending"],
+                options=TICKET_STATUSES,
                 index=0
             )
+            resolution = st.text_input("Resolution (optional)", key="ticket_resolution")
             
             if st.button("Update Status"):
-                if update_ticket_status(selected_ticket_to_close, new_status):
+                if update_ticket_status(selected_ticket_to_close, new_status, resolution):
                     st.success(f"Ticket {selected_ticket_to_close} updated to {new_status}")
                     st.session_state.tickets_refreshed = True
                     st.experimental_rerun()
@@ -473,12 +524,14 @@ def customer_support_view():
         
         if "chat_initialized" in st.session_state and st.session_state.chat_initialized:
             if "active_ticket" in st.session_state:
-                st.info(f"Active Ticket: {st.session_state.active_ticket}")
+                prefetched = get_prefetcher(st.session_state.zep_api_key).peek(st.session_state.active_ticket)
+                if prefetched is not None and prefetched.ticket:
+                    st.info(f"Active Ticket: {st.session_state.active_ticket} ({prefetched.ticket['status'].upper()})")
+                else:
+                    st.info(f"Active Ticket: {st.session_state.active_ticket}")
             
             # Display chat history
-            for message in st.session_state.messages:
-                with st.chat_message(message["role"]):
-                    st.markdown(message["content"])
+            render_chat_history()
         else:
             st.info("Please select or create a ticket to start a conversation")
     
@@ -486,12 +539,12 @@ def customer_support_view():
     if (st.session_state.get("chat_initialized", False) and 
         st.session_state.get("is_support_mode", False)):
         
-        # Create support agent
-        agent, user = create_agents(is_support_mode=True)
+        # Create support agent; in pool mode the worker builds its own for each turn
+        agent, user = create_agents(is_support_mode=True) if TURN_WORKERS == 0 else (None, None)
         
         # Handle user input - IMPORTANT: This is outside the tabs
         if prompt := st.chat_input("Type your message here..."):
-            if not agent or not user:
+            if TURN_WORKERS == 0 and (not agent or not user):
                 st.error("Failed to create agents. Please check configuration.")
                 return
                 
@@ -507,6 +560,9 @@ def main():
         initial_sidebar_state="expanded",
     )
 
+    # Start loading the model as soon as the app starts
+    residency = get_model_residency()
+
     # Create a layout with columns for title and clear button
     col1, col2 = st.columns([5, 1])
     with col1:
@@ -524,7 +580,9 @@ def main():
     # Clear chat history button
     with col2:
         if st.button("Clear ↺"):
-            st.session_state.messages = []
+            if "messages" in st.session_state:
+                st.session_state.messages.clear()
+            st.session_state.history_shown = 0
             st.rerun()
 
     # Sidebar for API key, user information and controls
@@ -601,6 +659,8 @@ def main():
                     st.info("Mode: Customer Support")
                 else:
                     st.info("Mode: Regular Assistant")
+                st.info(f"Model: {residency.model} ({'warm' if residency.is_warm() else 'cold'})")
+                st.checkbox("Profile my turns 🔬", key="profile_turns", help="Write a flamegraph-compatible profile of each turn")
 
     # Determine which view to show based on mode
     if st.session_state.get("chat_initialized", False):
@@ -608,18 +668,16 @@ def main():
             customer_support_view()
         else:
             # Regular chat interface
-            # Create agents
-            agent, user = create_agents()
-            if not agent or not user:
+            # Create agents; in pool mode the worker builds its own for each turn
+            agent, user = create_agents() if TURN_WORKERS == 0 else (None, None)
+            if TURN_WORKERS == 0 and (not agent or not user):
                 st.error(
                     "Failed to create agents. Please check your autogen configuration."
                 )
                 return
 
             # Display chat history
-            for message in st.session_state.messages:
-                with st.chat_message(message["role"]):
-                    st.markdown(message["content"])
+            render_chat_history()
 
             # Handle user input
             if prompt := st.chat_input("How are you feeling today?"):
@@ -0,0 +1,148 @@
+"""
+Bounded chat history for Streamlit sessions.
+
+Only the most recent messages stay in memory; older ones are spilled to a
+process-wide SQLite file and paged back in on request, so per-user memory and
+the cost of re-rendering on each rerun stay constant for long tickets.
+
+Histories with no new spilled message for CHAT_HISTORY_TTL seconds (default one
+day) are deleted, which covers browser sessions that were abandoned, and the
+file is removed when the process exits.
+"""
+import atexit
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+
+
+CHAT_HISTORY_TTL = float(os.environ.get("CHAT_HISTORY_TTL", str(24 * 3600)))
+
+
+class SpillStore:
+    """
+    SQLite store for messages spilled out of ChatHistory buffers.
+
+    Args:
+        path (str): Database file
+        ttl (float): Seconds after its last spill that a history is deleted
+        expire_interval (float): Minimum seconds between expiry sweeps
+    """
+
+    def __init__(self, path, ttl=CHAT_HISTORY_TTL, expire_interval=600.0):
+        self.ttl = ttl
+        self.expire_interval = expire_interval
+        self._last_expire = time.monotonic()
+        self._lock = threading.Lock()
+        # Streamlit serves each session from its own thread
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS messages (
+                    history_key TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    spilled_at REAL NOT NULL,
+                    PRIMARY KEY (history_key, seq)
+                )"""
+            )
+
+    def add(self, history_key, seq, message):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO messages VALUES (?, ?, ?, ?, ?)",
+                (history_key, seq, message["role"], message["content"], time.time()),
+            )
+        if time.monotonic() - self._last_expire > self.expire_interval:
+            self.expire()
+
+    def expire(self):
+        """Delete histories whose newest spilled message is older than the TTL."""
+        self._last_expire = time.monotonic()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM messages WHERE history_key IN ("
+                " SELECT history_key FROM messages GROUP BY history_key HAVING MAX(spilled_at) < ?)",
+                (time.time() - self.ttl,),
+            )
+
+    def range(self, history_key, start, end):
+        """Return spilled messages with start <= seq < end, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages"
+                " WHERE history_key = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (history_key, start, end),
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def delete(self, history_key):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE history_key = ?", (history_key,))
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store():
+    """Return the process-wide spill store, created on first use."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            path = os.path.join(tempfile.gettempdir(), f"zep_chat_history_{os.getpid()}.sqlite3")
+            # A file at this path was left by an earlier process with the same PID
+            if os.path.exists(path):
+                os.remove(path)
+            _default_store = SpillStore(path)
+            atexit.register(os.remove, path)
+    return _default_store
+
+
+class ChatHistory:
+    """
+    Chat messages with a bounded in-memory buffer of recent messages.
+
+    Iterating yields only the recent messages; older ones are available
+    through earlier().
+
+    Args:
+        max_recent (int): Messages kept in memory
+        store (SpillStore): Where older messages go, defaults to default_store()
+    """
+
+    def __init__(self, max_recent=50, store=None):
+        self.key = uuid.uuid4().hex
+        self.max_recent = max_recent
+        self.spilled_count = 0
+        self._recent = deque()
+        self._store = store or default_store()
+
+    def append(self, message):
+        """Add a message, spilling the oldest recent message if the buffer is full."""
+        self._recent.append(message)
+        if len(self._recent) > self.max_recent:
+            self._store.add(self.key, self.spilled_count, self._recent.popleft())
+            self.spilled_count += 1
+
+    def earlier(self, count):
+        """Return up to count spilled messages preceding the recent ones, oldest first."""
+        if count <= 0:
+            return []
+        return self._store.range(self.key, max(0, self.spilled_count - count), self.spilled_count)
+
+    def clear(self):
+        """Drop all messages, including spilled ones."""
+        self._store.delete(self.key)
+        self._recent.clear()
+        self.spilled_count = 0
+
+    def __iter__(self):
+        return iter(self._recent)
+
+    def __len__(self):
+        return self.spilled_count + len(self._recent)
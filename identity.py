@@ -0,0 +1,120 @@
+"""
+Durable user identity directory.
+
+generate_user_id folds the current month into the hash, so on its own every
+returning customer gets a new Zep user each month. The directory maps a
+normalized name (or an external customer key) to the user_id issued the first
+time and remembers whether that user already exists in Zep, so returning users
+skip the user.get/user.add round trips and keep their memory.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from util import generate_user_id
+
+
+def identity_key(first_name, last_name, external_key=None):
+    """Normalize a name (or use an external customer key) into a directory key."""
+    if external_key:
+        return f"ext:{external_key.strip()}"
+    first = " ".join(first_name.split()).casefold()
+    last = " ".join(last_name.split()).casefold()
+    return f"name:{first}|{last}"
+
+
+def new_user_id(first_name, last_name, external_key=None):
+    """
+    Issue the user ID for an identity seen for the first time.
+
+    External keys get an ID derived from the key alone, so two customers with
+    the same name stay separate. Name identities keep the ID generate_user_id
+    gives them today, so users already created in Zep this month keep their memory.
+    """
+    if external_key:
+        digest = hashlib.sha256(identity_key(first_name, last_name, external_key).encode()).hexdigest()
+        return f"user_x{digest[:16]}"
+    return generate_user_id(first_name, last_name)
+
+
+class IdentityDirectory:
+    """
+    SQLite-backed identity directory with an in-memory LRU cache.
+
+    Args:
+        path (str): Database file
+        cache_size (int): Entries kept in the LRU cache
+    """
+
+    def __init__(self, path, cache_size=10000):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS identities (
+                    identity_key TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    known_in_zep INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS identities_user_id ON identities (user_id)"
+            )
+
+    def _cache_put(self, key, entry):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def resolve(self, first_name, last_name, external_key=None):
+        """
+        Return the durable user ID for a person, issuing one on first sight.
+
+        Returns:
+            tuple: (user_id, known_in_zep)
+        """
+        key = identity_key(first_name, last_name, external_key)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                return entry
+
+            row = self._conn.execute(
+                "SELECT user_id, known_in_zep FROM identities WHERE identity_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                row = (new_user_id(first_name, last_name, external_key), 0)
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT INTO identities VALUES (?, ?, ?, ?)",
+                        (key, row[0], row[1], datetime.now().isoformat()),
+                    )
+
+            entry = (row[0], bool(row[1]))
+            self._cache_put(key, entry)
+            return entry
+
+    def mark_known(self, first_name, last_name, external_key=None):
+        """Record that the identity's user now exists in Zep."""
+        key = identity_key(first_name, last_name, external_key)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE identities SET known_in_zep = 1 WHERE identity_key = ?", (key,)
+            )
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache_put(key, (entry[0], True))
+
+
+def default_directory_path():
+    """Directory database location, overridable with IDENTITY_DB."""
+    return os.environ.get(
+        "IDENTITY_DB", os.path.join(os.path.dirname(__file__), "identities.sqlite3")
+    )
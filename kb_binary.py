@@ -0,0 +1,198 @@
+"""
+Precompiled binary format for the support knowledge base.
+
+Build step:
+
+    python kb_binary.py support_kb.json support_kb.bin
+
+File layout (little endian):
+
+    header      magic "ZKB1", article count, string count, rendered offset, rendered length
+    articles    per article: id string, title string, rendered offset, rendered length
+    strings     per string: offset, length (into the string blob)
+    blobs       interned UTF-8 strings, then the rendered knowledge base text
+
+The rendered text is stored as one contiguous block so the whole knowledge base
+and every single article are plain slices of the memory-mapped file.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+
+MAGIC = b"ZKB1"
+HEADER = struct.Struct("<4sIIQQ")
+ARTICLE = struct.Struct("<IIQQ")
+STRING = struct.Struct("<QQ")
+
+KB_HEADER = "# KNOWLEDGE BASE ARTICLES\n\n"
+
+
+def render_article(article):
+    """
+    Render a single knowledge base article to the prompt text format.
+
+    Args:
+        article (dict): Article with 'id', 'title', 'content' and 'solutions'
+
+    Returns:
+        str: Formatted article text
+    """
+    parts = [
+        f"## {article.get('title', 'Untitled Article')}\n",
+        f"ID: {article.get('id', 'unknown')}\n",
+        f"{article.get('content', 'No content available')}\n\n",
+    ]
+
+    if article.get("solutions"):
+        parts.append("### Solutions:\n")
+        for i, solution in enumerate(article["solutions"], 1):
+            parts.append(f"{i}. {solution}\n")
+        parts.append("\n")
+
+    return "".join(parts)
+
+
+def compile_knowledge_base(kb_data, out_path, rendered_articles=None):
+    """
+    Compile parsed knowledge base JSON into the binary format.
+
+    Args:
+        kb_data (dict): Knowledge base with an 'articles' list
+        out_path (str): Destination file
+        rendered_articles (list): Rendered text of each article, e.g. from a
+            hot-reload snapshot; rendered here when omitted
+
+    Returns:
+        int: Number of articles written
+    """
+    strings = []
+    interned = {}
+
+    def intern(value):
+        if value not in interned:
+            interned[value] = len(strings)
+            strings.append(value.encode("utf-8"))
+        return interned[value]
+
+    articles = kb_data.get("articles", [])
+    records = []
+    rendered = [KB_HEADER.encode("utf-8")]
+    position = len(rendered[0])
+    if rendered_articles is None:
+        rendered_articles = [render_article(article) for article in articles]
+    for article, text in zip(articles, rendered_articles):
+        text = text.encode("utf-8")
+        records.append((
+            intern(str(article.get("id", "unknown"))),
+            intern(str(article.get("title", "Untitled Article"))),
+            position,
+            len(text),
+        ))
+        rendered.append(text)
+        position += len(text)
+
+    # Absolute offsets of the string blob and the rendered block
+    strings_start = HEADER.size + ARTICLE.size * len(records) + STRING.size * len(strings)
+    rendered_start = strings_start + sum(len(s) for s in strings)
+
+    # Write a temporary file and rename it over out_path, so processes that have
+    # the old file mapped keep reading the old inode instead of a truncated one
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=".kb-", suffix=".tmp", dir=os.path.dirname(os.path.abspath(out_path))
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(records), len(strings), rendered_start, position))
+            for id_index, title_index, offset, length in records:
+                f.write(ARTICLE.pack(id_index, title_index, rendered_start + offset, length))
+            offset = strings_start
+            for data in strings:
+                f.write(STRING.pack(offset, len(data)))
+                offset += len(data)
+            for data in strings:
+                f.write(data)
+            for data in rendered:
+                f.write(data)
+        # mkstemp creates the file owner-only; other service users must be able to map it
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    return len(records)
+
+
+class KnowledgeBaseImage:
+    """
+    Read-only, memory-mapped view of a compiled knowledge base.
+
+    Opening the file does no parsing; articles and strings are sliced out of
+    the mapping on demand, so processes share the pages through the OS cache.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        magic, self.article_count, self.string_count, rendered_start, rendered_length = (
+            HEADER.unpack_from(self._mm, 0)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled knowledge base")
+        self._rendered = (rendered_start, rendered_length)
+        self._strings_table = HEADER.size + ARTICLE.size * self.article_count
+        self._id_index = None
+        self._text = None
+
+    def __len__(self):
+        return self.article_count
+
+    def rendered(self):
+        """Return the full rendered knowledge base as a memoryview."""
+        start, length = self._rendered
+        return self._view[start:start + length]
+
+    def text(self):
+        """Return the full rendered knowledge base as a str, decoded once per mapping."""
+        if self._text is None:
+            self._text = str(self.rendered(), "utf-8")
+        return self._text
+
+    def string(self, index):
+        """Return interned string number index."""
+        offset, length = STRING.unpack_from(self._mm, self._strings_table + STRING.size * index)
+        return str(self._view[offset:offset + length], "utf-8")
+
+    def article(self, index):
+        """
+        Return (id, title, rendered memoryview) for article number index.
+        """
+        id_index, title_index, offset, length = ARTICLE.unpack_from(
+            self._mm, HEADER.size + ARTICLE.size * index
+        )
+        return self.string(id_index), self.string(title_index), self._view[offset:offset + length]
+
+    def find(self, article_id):
+        """Return the rendered memoryview of the article with article_id, or None."""
+        if self._id_index is None:
+            self._id_index = {}
+            for index in range(self.article_count):
+                id_index, _, _, _ = ARTICLE.unpack_from(self._mm, HEADER.size + ARTICLE.size * index)
+                self._id_index[self.string(id_index)] = index
+        index = self._id_index.get(article_id)
+        return None if index is None else self.article(index)[2]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python kb_binary.py support_kb.json support_kb.bin")
+
+    with open(sys.argv[1], "r") as f:
+        count = compile_knowledge_base(json.load(f), sys.argv[2])
+    print(f"Compiled {count} articles into {sys.argv[2]}")
@@ -0,0 +1,182 @@
+"""
+Incremental hot-reload of support_kb.json.
+
+A background thread polls the file; on change, articles are diffed by 'id' and
+only added or changed articles are re-rendered. Each reload publishes a new
+immutable KnowledgeBaseSnapshot with a single reference swap, so a turn that
+already holds a snapshot keeps a consistent view of the knowledge base.
+"""
+import json
+import os
+import threading
+from types import MappingProxyType
+from kb_binary import KB_HEADER, render_article
+
+
+class KnowledgeBaseSnapshot:
+    """
+    Immutable view of the knowledge base at one version.
+
+    Attributes:
+        version (int): Increases by one on every applied change
+        order (tuple): Article keys (see article_keys) in file order
+        articles (Mapping): Article key -> article dict
+        rendered (Mapping): Article key -> rendered article text
+        text (str): Full rendered knowledge base
+    """
+
+    def __init__(self, version, order, articles, rendered):
+        self.version = version
+        self.order = tuple(order)
+        self.articles = MappingProxyType(articles)
+        self.rendered = MappingProxyType(rendered)
+        self.text = KB_HEADER + "".join(rendered[key] for key in self.order)
+
+
+EMPTY_SNAPSHOT = KnowledgeBaseSnapshot(0, (), {}, {})
+
+
+def article_id(article):
+    """Return the ID used to match an article across reloads."""
+    return str(article.get("id", "unknown"))
+
+
+def article_keys(articles):
+    """
+    Return a unique key per article, in file order.
+
+    The key is the article ID; the second and later articles sharing an ID
+    (including articles without one) get '#2', '#3', ... appended, so every
+    article is kept, as in the non-watched loader.
+    """
+    seen = {}
+    keys = []
+    for article in articles:
+        key = article_id(article)
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}#{seen[key]}")
+    return keys
+
+
+def parse_articles(kb_data):
+    """
+    Return the article list of parsed knowledge base JSON.
+
+    Raises:
+        ValueError: The file is not an object with a list of article objects
+    """
+    articles = kb_data.get("articles", []) if isinstance(kb_data, dict) else None
+    if not isinstance(articles, list) or not all(isinstance(a, dict) for a in articles):
+        raise ValueError("knowledge base must be an object with an 'articles' list of objects")
+    return articles
+
+
+def diff_articles(snapshot, articles):
+    """
+    Compare a new article list against a snapshot by article key.
+
+    Args:
+        snapshot (KnowledgeBaseSnapshot): Current knowledge base
+        articles (list): Articles parsed from the JSON file
+
+    Returns:
+        tuple: (added, changed, removed) sets of article keys
+    """
+    by_key = dict(zip(article_keys(articles), articles))
+    new_keys = set(by_key)
+    old_keys = set(snapshot.articles)
+    changed = {
+        key for key in new_keys & old_keys if snapshot.articles[key] != by_key[key]
+    }
+    return new_keys - old_keys, changed, old_keys - new_keys
+
+
+class KnowledgeBaseWatcher:
+    """
+    Poll a knowledge base JSON file and apply changes incrementally.
+
+    Args:
+        path (str): Path of support_kb.json
+        interval (float): Seconds between file checks
+    """
+
+    def __init__(self, path, interval=2.0):
+        self.path = path
+        self.interval = interval
+        self.snapshot = EMPTY_SNAPSHOT
+        self._signature = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self):
+        """
+        Re-read the file and apply only the articles that changed.
+
+        Returns:
+            tuple: (added, changed, removed) sets of article keys
+        """
+        signature = self._file_signature()
+        if signature is None:
+            articles = []
+        else:
+            with open(self.path, "r") as f:
+                articles = parse_articles(json.load(f))
+
+        current = self.snapshot
+        added, changed, removed = diff_articles(current, articles)
+        self._signature = signature
+
+        order = article_keys(articles)
+        if not (added or changed or removed) and tuple(order) == current.order:
+            return added, changed, removed
+
+        by_key = dict(zip(order, articles))
+        rendered = {
+            key: (
+                render_article(article)
+                if key in added or key in changed
+                else current.rendered[key]
+            )
+            for key, article in by_key.items()
+        }
+
+        # Publish the new snapshot with a single reference swap
+        self.snapshot = KnowledgeBaseSnapshot(current.version + 1, order, by_key, rendered)
+        return added, changed, removed
+
+    def poll(self):
+        """Reload if the file changed since the last check."""
+        signature = self._file_signature()
+        if signature != self._signature:
+            try:
+                self.reload()
+            except Exception as e:
+                # A bad file (unreadable, invalid JSON, wrong shape, or an article
+                # that fails to render) must not stop the watcher; keep serving
+                # the last good snapshot until the next edit
+                self._signature = signature
+                print(f"Error reloading knowledge base: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        """Load the file and start the polling thread."""
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name="kb-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the polling thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
@@ -5,4 +5,25 @@ config_list = [
         "api_type": "ollama",
         "client_host": "http://127.0.0.1:11434",  # Ollama host
     }
-]
\ No newline at end of file
+]
+
+# Per-mode generation limits passed to ZepConversableAgent(generation_policy=...)
+#   max_tokens: cap on generated tokens (Ollama num_predict)
+#   stop: stop sequences
+#   disable_reasoning: ask the backend to skip <think> (Ollama's `think` switch)
+#   think_budget: abort generation once a <think> block exceeds this many tokens,
+#     then generate the reply again with reasoning switched off
+generation_policies = {
+    "assistant": {
+        "max_tokens": 512,
+        "stop": [],
+        "disable_reasoning": True,
+        "think_budget": 32,
+    },
+    "support": {
+        "max_tokens": 768,
+        "stop": [],
+        "disable_reasoning": True,
+        "think_budget": 32,
+    },
+}
@@ -0,0 +1,174 @@
+"""
+Warm-up and residency management for the Ollama model in llm_config.
+
+The model is preloaded at start-up and kept resident with empty keep-alive
+requests while there is traffic. How long it is held after the last turn adapts
+to the observed gaps between turns, so sparse traffic does not pay a model load
+on every message and long idle periods still let Ollama free the memory.
+Turns record the model load and inference time that Ollama reports for the
+reply separately from their wall time, which also covers the Zep calls.
+"""
+import threading
+import time
+from collections import deque
+from ollama import Client
+from llm_config import config_list
+
+
+NS_PER_SECOND = 1e9
+# Ollama reports a near-zero load duration when the model was already resident
+MIN_LOAD_SECONDS = 0.5
+
+
+class ModelResidency:
+    """
+    Keep an Ollama model loaded while it is likely to be used.
+
+    Args:
+        config (dict): Entry of llm_config.config_list
+        keep_alive (str): Keep-alive sent with preload/ping requests
+        ping_interval (float): Seconds between keep-alive pings
+        min_hold (float): Minimum seconds to stay warm after the last turn
+        max_hold (float): Maximum seconds to stay warm after the last turn
+        warm_window (float): Seconds Ollama keeps the model after a turn (its default keep-alive)
+    """
+
+    def __init__(
+        self,
+        config=None,
+        keep_alive="10m",
+        ping_interval=240.0,
+        min_hold=900.0,
+        max_hold=4 * 3600.0,
+        warm_window=300.0,
+    ):
+        config = config or config_list[0]
+        self.model = config["model"]
+        self.keep_alive = keep_alive
+        self.ping_interval = ping_interval
+        self.min_hold = min_hold
+        self.max_hold = max_hold
+        self.warm_window = warm_window
+        self._client = Client(host=config.get("client_host"))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._warming = threading.Lock()
+
+        self.last_activity = time.monotonic()
+        self.last_loaded = None
+        # Recent gaps between turns, used to size the hold window
+        self._gaps = deque(maxlen=100)
+        self.stats = {
+            "loads": 0,
+            "load_seconds": 0.0,
+            "turns": 0,
+            "cold_turns": 0,
+            "turn_seconds": 0.0,
+            "inference_seconds": 0.0,
+        }
+
+    def _warm_request(self):
+        """Send an empty generate request, which loads the model and resets its expiry."""
+        response = self._client.generate(model=self.model, prompt="", keep_alive=self.keep_alive)
+        load_seconds = (response.load_duration or 0) / NS_PER_SECOND
+        with self._lock:
+            self.last_loaded = time.monotonic()
+            if load_seconds > MIN_LOAD_SECONDS:
+                self.stats["loads"] += 1
+                self.stats["load_seconds"] += load_seconds
+        return load_seconds
+
+    def preload(self):
+        """Load the model now. Returns the load time in seconds."""
+        return self._warm_request()
+
+    def ensure_warm(self):
+        """Start loading the model in the background if it is likely cold."""
+        if self.is_warm() or not self._warming.acquire(blocking=False):
+            return
+
+        def warm():
+            try:
+                self._warm_request()
+            except Exception as e:
+                print(f"Ollama warm-up failed: {e}")
+            finally:
+                self._warming.release()
+
+        threading.Thread(target=warm, name="ollama-warmup", daemon=True).start()
+
+    def hold_seconds(self):
+        """How long to keep the model warm after the last turn."""
+        with self._lock:
+            gaps = sorted(self._gaps)
+        if not gaps:
+            return self.min_hold
+        p90 = gaps[int(0.9 * (len(gaps) - 1))]
+        return min(self.max_hold, max(self.min_hold, 2 * p90))
+
+    def is_warm(self):
+        """Whether the model is expected to be loaded, from the last warm request or turn."""
+        with self._lock:
+            last = self.last_loaded
+        return last is not None and time.monotonic() - last < self.warm_window
+
+    def is_loaded(self):
+        """Ask Ollama whether the model is currently loaded."""
+        return any(m.model == self.model or m.name == self.model for m in self._client.ps().models)
+
+    def record_turn(self, seconds, was_warm, generation=None):
+        """
+        Record a completed turn and its latency.
+
+        Args:
+            seconds (float): Wall time of the whole turn, including Zep calls
+            was_warm (bool): is_warm() before the turn; decides whether the turn
+                was cold when Ollama reported no timings
+            generation (dict): The agent's last_generation_stats, with the model
+                load and inference time reported by Ollama
+        """
+        load_seconds = (generation or {}).get("load_seconds")
+        now = time.monotonic()
+        with self._lock:
+            self._gaps.append(now - self.last_activity)
+            self.last_activity = now
+            self.last_loaded = now
+            self.stats["turns"] += 1
+            self.stats["turn_seconds"] += seconds
+            if load_seconds is None:
+                cold = not was_warm
+            else:
+                cold = load_seconds > MIN_LOAD_SECONDS
+                self.stats["inference_seconds"] += generation["inference_seconds"]
+            if cold:
+                self.stats["cold_turns"] += 1
+                if load_seconds is not None:
+                    self.stats["loads"] += 1
+                    self.stats["load_seconds"] += load_seconds
+
+    def _run(self):
+        try:
+            self.preload()
+        except Exception as e:
+            print(f"Ollama preload failed: {e}")
+
+        while not self._stop.wait(self.ping_interval):
+            idle = time.monotonic() - self.last_activity
+            if idle < self.hold_seconds():
+                try:
+                    self._warm_request()
+                except Exception as e:
+                    print(f"Ollama keep-alive failed: {e}")
+
+    def start(self):
+        """Start the thread that preloads the model and sends keep-alive pings."""
+        self._thread = threading.Thread(target=self._run, name="ollama-residency", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the keep-alive thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
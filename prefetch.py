@@ -0,0 +1,95 @@
+"""
+Background prefetch of Zep context for a session before its first turn.
+
+As soon as a session is initialized or a ticket is selected, the memory
+context and ticket metadata are fetched on a thread pool. The first turn then
+takes the warm result instead of paying a cold memory.get. Results that are
+never taken are dropped once they go stale.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from util import extract_ticket_info
+
+
+class PrefetchedContext:
+    """Memory context and ticket info fetched for one session."""
+
+    def __init__(self, session_id, memory_context, ticket):
+        self.session_id = session_id
+        self.memory_context = memory_context
+        self.ticket = ticket
+        self.fetched_at = time.monotonic()
+
+
+class Prefetcher:
+    """
+    Prefetch memory context and ticket metadata per session ID.
+
+    Args:
+        zep: Zep client
+        min_fact_rating (float): Same minimum rating the agent uses
+        ttl (float): Seconds a prefetched result stays usable
+        workers (int): Background fetch threads
+    """
+
+    def __init__(self, zep, min_fact_rating=0.7, ttl=60.0, workers=4):
+        self.zep = zep
+        self.min_fact_rating = min_fact_rating
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="zep-prefetch")
+        self._lock = threading.Lock()
+        self._futures = {}
+
+    def _fetch(self, session_id, is_ticket):
+        memory = self.zep.memory.get(session_id, min_rating=self.min_fact_rating)
+        ticket = extract_ticket_info(self.zep.memory.get_session(session_id)) if is_ticket else None
+        return PrefetchedContext(session_id, memory.context, ticket)
+
+    def _is_fresh(self, future):
+        if not future.done():
+            return True
+        if future.exception() is not None:
+            return False
+        return time.monotonic() - future.result().fetched_at < self.ttl
+
+    def _evict_stale(self):
+        """Drop finished fetches that failed or outlived the TTL without being taken."""
+        for session_id, future in list(self._futures.items()):
+            if not self._is_fresh(future):
+                del self._futures[session_id]
+
+    def prefetch(self, session_id, is_ticket=False):
+        """Start fetching context for session_id unless a fresh fetch exists."""
+        with self._lock:
+            self._evict_stale()
+            if session_id not in self._futures:
+                self._futures[session_id] = self._executor.submit(self._fetch, session_id, is_ticket)
+
+    def peek(self, session_id):
+        """Return the prefetched context if it is ready and fresh, without consuming it."""
+        with self._lock:
+            future = self._futures.get(session_id)
+        if future is None or not future.done() or not self._is_fresh(future):
+            return None
+        return future.result()
+
+    def take(self, session_id, timeout=None):
+        """
+        Consume the prefetched context for session_id.
+        Waits for an in-flight fetch rather than starting a second one.
+
+        Returns:
+            PrefetchedContext: Warm context, or None if missing, failed or stale
+        """
+        with self._lock:
+            future = self._futures.pop(session_id, None)
+        if future is None:
+            return None
+        try:
+            context = future.result(timeout=timeout)
+        except Exception:
+            return None
+        if time.monotonic() - context.fetched_at >= self.ttl:
+            return None
+        return context
@@ -0,0 +1,165 @@
+"""
+On-demand stack-sampling profiler for single turns.
+
+A turn is profiled when its session has the debug flag set, or for 1 in N
+turns when PROFILE_SAMPLE_N is set. A background thread samples the turn's
+thread stack every few milliseconds and writes the result in the folded
+("collapsed") stack format read by flamegraph.pl, speedscope and inferno.
+When a turn is not profiled nothing is started, so the cost is one check.
+
+The thread that enters profile_turn is sampled, plus any worker thread doing
+work for the turn inside sampled_thread() (the resilient Zep layer runs its
+requests this way); their stacks are rooted at the thread's name. In the
+Streamlit app the entering thread is the session's own thread, or with
+TURN_WORKERS the worker process's thread running the turn. In the API server
+it is the shared event loop, so a profile covers every session's coroutines
+and the loop's idle wait during the turn.
+"""
+import contextvars
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "zep-profiles"))
+PROFILE_SAMPLE_N = int(os.environ.get("PROFILE_SAMPLE_N", "0"))
+
+# Sampler of the turn being profiled in the current context, if any
+_current_sampler = contextvars.ContextVar("current_sampler", default=None)
+
+
+def should_profile(debug_flag=False, sample_n=PROFILE_SAMPLE_N):
+    """Decide whether to profile this turn: debug flag, or 1 in sample_n turns."""
+    return bool(debug_flag) or (sample_n > 0 and random.randrange(sample_n) == 0)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Sample a thread's stack, and those of helper threads added with
+    add_thread, at a fixed interval.
+
+    Args:
+        thread_id (int): Thread to sample, defaults to the calling thread
+        interval (float): Seconds between samples
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        # Helper thread ID -> count of calls in progress for this turn
+        self._helpers = Counter()
+        self._helpers_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_thread(self, thread_id):
+        with self._helpers_lock:
+            self._helpers[thread_id] += 1
+
+    def remove_thread(self, thread_id):
+        with self._helpers_lock:
+            self._helpers[thread_id] -= 1
+            if self._helpers[thread_id] <= 0:
+                del self._helpers[thread_id]
+
+    def _sample(self):
+        frames = sys._current_frames()
+        with self._helpers_lock:
+            helpers = list(self._helpers)
+        names = {t.ident: t.name for t in threading.enumerate()} if helpers else {}
+        for thread_id in [self.thread_id, *helpers]:
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if thread_id != self.thread_id:
+                labels.append(f"[{names.get(thread_id, thread_id)}]")
+            self.stacks[";".join(reversed(labels))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.stacks
+
+    def write_folded(self, path):
+        """Write samples as folded stacks: 'root;...;leaf count' per line."""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def sampled_thread():
+    """
+    Include the calling thread in the profile of the turn whose context it runs
+    in (see contextvars.copy_context), while the block runs.
+    """
+    sampler = _current_sampler.get()
+    if sampler is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    sampler.add_thread(thread_id)
+    try:
+        yield
+    finally:
+        sampler.remove_thread(thread_id)
+
+
+def _safe(value):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(value))
+
+
+@contextmanager
+def profile_turn(session_id, ticket_id=None, enabled=False, out_dir=None):
+    """
+    Profile the enclosed turn if enabled.
+
+    Yields a dict whose 'path' is set to the written profile (None when disabled).
+    The file name carries the session and ticket IDs and a timestamp.
+    """
+    result = {"path": None}
+    if not enabled:
+        yield result
+        return
+
+    sampler = StackSampler().start()
+    token = _current_sampler.set(sampler)
+    start = time.monotonic()
+    try:
+        yield result
+    finally:
+        _current_sampler.reset(token)
+        sampler.stop()
+        out_dir = out_dir or PROFILE_DIR
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        elapsed_ms = int((time.monotonic() - start) * 1000)
+        name = f"{stamp}_{_safe(session_id)}_{_safe(ticket_id or 'no-ticket')}_{elapsed_ms}ms.folded"
+        result["path"] = os.path.join(out_dir, name)
+        sampler.write_folded(result["path"])
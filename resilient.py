@@ -0,0 +1,348 @@
+"""
+Tail-latency protection for Zep reads.
+
+Zep latency has a long tail: most memory.get calls are fast, but an occasional
+straggler sets the latency of the whole turn. ResilientZep learns the latency
+distribution of each read operation and uses it three ways:
+
+- adaptive timeouts: each attempt is bounded by a multiple of the observed p99,
+  clamped to [min_timeout, max_timeout], instead of the HTTP client's default;
+- hedging: if a read has not answered by the observed p95, a duplicate request
+  is sent and whichever answers first wins;
+- retries: timeouts, transport errors and 429/5xx responses are retried with
+  full-jitter backoff.
+
+Hedges and retries draw from a shared budget that refills with a fraction of
+successful calls, so a Zep outage does not get multiplied by extra load.
+Writes are not idempotent (memory.add would store a message twice), so they
+are passed through unchanged.
+"""
+import asyncio
+import contextvars
+import inspect
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import httpx
+from zep_cloud.core.api_error import ApiError
+from profiling import sampled_thread
+
+
+# Idempotent reads that are timed, hedged and retried
+READ_OPERATIONS = {
+    "memory": ["get", "get_session", "get_session_messages", "list_sessions"],
+    "user": ["get"],
+}
+
+
+def is_retryable(error):
+    """Whether a failed attempt may succeed if repeated."""
+    if isinstance(error, (TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, ApiError):
+        return error.status_code == 429 or (error.status_code or 0) >= 500
+    return False
+
+
+class RetryBudget:
+    """
+    Token bucket for extra requests (hedges and retries).
+
+    Args:
+        ratio (float): Tokens earned per successful call
+        capacity (float): Maximum tokens, which bounds a burst of extra requests
+    """
+
+    def __init__(self, ratio=0.1, capacity=10.0):
+        self.ratio = ratio
+        self.capacity = capacity
+        self._tokens = capacity
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """Spend one token. Returns False when the budget is exhausted."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CallPolicy:
+    """
+    Latency statistics and limits for Zep operations, shareable between clients.
+
+    Args:
+        window (int): Recent latencies kept per operation
+        min_samples (int): Samples needed before percentiles are trusted;
+            until then attempts use max_timeout and are not hedged
+        timeout_multiplier (float): Attempt timeout as a multiple of p99
+        min_timeout (float): Lower bound for the attempt timeout, in seconds
+        max_timeout (float): Upper bound for the attempt timeout, in seconds
+        min_hedge_delay (float): Never hedge sooner than this, in seconds
+        max_attempts (int): Attempts per call, including the first
+        backoff_base (float): Base delay for full-jitter backoff, in seconds
+        backoff_cap (float): Maximum backoff delay, in seconds
+        budget (RetryBudget): Budget for hedges and retries
+    """
+
+    def __init__(
+        self,
+        window=500,
+        min_samples=20,
+        timeout_multiplier=3.0,
+        min_timeout=0.5,
+        max_timeout=10.0,
+        min_hedge_delay=0.01,
+        max_attempts=3,
+        backoff_base=0.05,
+        backoff_cap=1.0,
+        budget=None,
+    ):
+        self.min_samples = min_samples
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_hedge_delay = min_hedge_delay
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.budget = budget or RetryBudget()
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self.stats = defaultdict(int)
+
+    def record(self, operation, seconds):
+        with self._lock:
+            self._latencies[operation].append(seconds)
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def percentile(self, operation, q):
+        """Nearest-rank percentile of recent latencies, or None without enough samples."""
+        with self._lock:
+            values = sorted(self._latencies[operation])
+        if len(values) < self.min_samples:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def timeout(self, operation):
+        """Timeout for one attempt of an operation."""
+        p99 = self.percentile(operation, 0.99)
+        if p99 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, self.timeout_multiplier * p99))
+
+    def hedge_delay(self, operation):
+        """Delay before sending a duplicate request, or None to not hedge."""
+        p95 = self.percentile(operation, 0.95)
+        if p95 is None:
+            return None
+        return max(self.min_hedge_delay, p95)
+
+    def backoff(self, attempt):
+        """Full-jitter backoff before retry number attempt (1-based)."""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+
+def _with_timeout(kwargs, timeout):
+    """Pass the attempt timeout to the Zep client and turn off its own retries."""
+    options = dict(kwargs.get("request_options") or {})
+    options.setdefault("timeout_in_seconds", timeout)
+    options.setdefault("max_retries", 0)
+    return {**kwargs, "request_options": options}
+
+
+class _ResilientClient:
+    """Wrap a Zep sub-client so selected read methods are timed, hedged and retried."""
+
+    def __init__(self, client, policy, executor, name, methods):
+        self._client = client
+        self._policy = policy
+        self._executor = executor
+        for method in methods:
+            if hasattr(client, method):
+                setattr(self, method, self._resilient(f"{name}.{method}", getattr(client, method)))
+
+    def _resilient(self, operation, method):
+        policy = self._policy
+        if inspect.iscoroutinefunction(method):
+            async def call(*args, **kwargs):
+                for attempt in range(policy.max_attempts):
+                    try:
+                        result = await self._a_attempt(operation, method, args, kwargs)
+                        policy.budget.deposit()
+                        return result
+                    except Exception as e:
+                        if not self._should_retry(e, attempt):
+                            raise
+                    await asyncio.sleep(policy.backoff(attempt + 1))
+        else:
+            def call(*args, **kwargs):
+                for attempt in range(policy.max_attempts):
+                    try:
+                        result = self._attempt(operation, method, args, kwargs)
+                        policy.budget.deposit()
+                        return result
+                    except Exception as e:
+                        if not self._should_retry(e, attempt):
+                            raise
+                    time.sleep(policy.backoff(attempt + 1))
+        return call
+
+    def _should_retry(self, error, attempt):
+        policy = self._policy
+        if isinstance(error, TimeoutError):
+            policy.count("timeouts")
+        if attempt + 1 >= policy.max_attempts or not is_retryable(error):
+            return False
+        if not policy.budget.withdraw():
+            policy.count("budget_exhausted")
+            return False
+        policy.count("retries")
+        return True
+
+    def _attempt(self, operation, method, args, kwargs):
+        """One attempt: the request plus at most one hedge, bounded by the adaptive timeout."""
+        policy = self._policy
+        timeout = policy.timeout(operation)
+        hedge_delay = policy.hedge_delay(operation)
+        kwargs = _with_timeout(kwargs, timeout)
+
+        def submit():
+            """Queue a request; its 'started' event and time are set when a thread picks it up."""
+            started = threading.Event()
+
+            def send():
+                started.at = time.monotonic()
+                started.set()
+                # Show the request in the profile of the turn that made it
+                with sampled_thread():
+                    result = method(*args, **kwargs)
+                return result, time.monotonic() - started.at
+
+            future = self._executor.submit(contextvars.copy_context().run, send)
+            return future, started
+
+        primary, started = submit()
+        pending = {primary}
+        hedge = None
+        policy.count("calls")
+        # Time spent queued for a thread (e.g. in a burst of reads) is not Zep
+        # latency, so the hedge delay and timeout count from when the request starts
+        started.wait()
+        deadline = started.at + timeout
+        if hedge_delay is not None and hedge_delay < timeout:
+            done, _ = wait(pending, timeout=max(0.0, started.at + hedge_delay - time.monotonic()))
+            if not done and policy.budget.withdraw():
+                policy.count("hedges")
+                hedge, _ = submit()
+                pending.add(hedge)
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                policy.record(operation, seconds)
+                if future is hedge:
+                    policy.count("hedge_wins")
+                return result
+
+        if pending:
+            # Stragglers finish (or hit their HTTP timeout) in the background
+            policy.record(operation, timeout)
+            raise TimeoutError(f"Zep {operation} timed out after {timeout:.2f}s")
+        raise error
+
+    async def _a_attempt(self, operation, method, args, kwargs):
+        """Async version of _attempt; losing requests are cancelled."""
+        policy = self._policy
+        timeout = policy.timeout(operation)
+        hedge_delay = policy.hedge_delay(operation)
+        kwargs = _with_timeout(kwargs, timeout)
+        deadline = time.monotonic() + timeout
+
+        async def send():
+            sent = time.monotonic()
+            result = await method(*args, **kwargs)
+            return result, time.monotonic() - sent
+
+        pending = {asyncio.ensure_future(send())}
+        hedge = None
+        policy.count("calls")
+        try:
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done and policy.budget.withdraw():
+                    policy.count("hedges")
+                    hedge = asyncio.ensure_future(send())
+                    pending.add(hedge)
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    try:
+                        result, seconds = task.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    policy.record(operation, seconds)
+                    if task is hedge:
+                        policy.count("hedge_wins")
+                    return result
+
+            if pending:
+                policy.record(operation, timeout)
+                raise TimeoutError(f"Zep {operation} timed out after {timeout:.2f}s")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class ResilientZep:
+    """
+    Zep client wrapper with adaptive timeouts, hedged reads and budgeted retries.
+
+    Wraps a Zep or AsyncZep client; the reads in READ_OPERATIONS go through the
+    policy and everything else is passed through.
+
+    Args:
+        zep: Zep or AsyncZep client
+        policy (CallPolicy): Latency statistics, shareable between clients
+        executor (ThreadPoolExecutor): Threads for in-flight sync requests and
+            hedges, shareable between clients
+    """
+
+    def __init__(self, zep, policy=None, executor=None):
+        self._zep = zep
+        self.policy = policy or CallPolicy()
+        executor = executor or ThreadPoolExecutor(max_workers=32, thread_name_prefix="zep-call")
+        for name, methods in READ_OPERATIONS.items():
+            setattr(self, name, _ResilientClient(getattr(zep, name), self.policy, executor, name, methods))
+
+    def __getattr__(self, name):
+        return getattr(self._zep, name)
@@ -0,0 +1,421 @@
+"""
+Async HTTP/WebSocket API for the Zep support agent.
+
+Exposes session init, streaming chat and ticket CRUD on top of the same
+agent, prompts and ticket logic as the Streamlit app. Run with:
+
+    ZEP_API_KEY=... python server.py --port 8000
+
+Set KB_HOT_RELOAD=1 to apply support_kb.json edits to running sessions.
+
+Clients may ask for a turn to be profiled only when PROFILE_REQUESTS=1; such
+profiles sample the whole event loop, not just the requesting session.
+
+Sessions with no open chat socket are dropped after SESSION_IDLE_TTL seconds
+(default 1800) without a turn; clients then start a new one with POST /sessions.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from autogen import UserProxyAgent
+from tornado.ioloop import PeriodicCallback
+from tornado.web import Application, HTTPError, RequestHandler
+from tornado.websocket import WebSocketHandler, WebSocketClosedError
+from zep_cloud.client import AsyncZep
+from llm_config import config_list, generation_policies
+from llm_residency import ModelResidency
+from profiling import profile_turn, should_profile
+from resilient import ResilientZep
+from singleflight import SingleFlightZep
+from agent import ZepConversableAgent
+from support import (
+    NO_THINK_SUFFIX,
+    TICKET_STATUSES,
+    WELCOME_MESSAGES,
+    ThinkStreamFilter,
+    a_attach_to_ticket,
+    a_create_ticket,
+    a_ensure_user_session,
+    a_list_user_tickets,
+    a_set_ticket_status,
+    build_system_message,
+    strip_think_blocks,
+)
+from identity import IdentityDirectory, default_directory_path
+from ticket_index import TicketIndex
+from transcript_export import a_iter_ticket_sessions
+from util import enable_knowledge_base_hot_reload, extract_ticket_info
+
+
+# Honour "profile": true from clients (each profiled turn writes a file)
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS") == "1"
+
+# Seconds a session without an open socket is kept after its last activity
+SESSION_IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", "1800"))
+
+class ChatSession:
+    """Server-side state for one chat session (the async twin of st.session_state)."""
+
+    def __init__(self, zep, session_id, user_id, display_name, is_support_mode, ticket_id=None):
+        self.session_id = session_id
+        self.ticket_id = ticket_id
+        self.user_id = user_id
+        self.display_name = display_name
+        self.is_support_mode = is_support_mode
+        # Turns within a session run one at a time
+        self.lock = asyncio.Lock()
+        # Open chat sockets and last activity, used for idle eviction
+        self.sockets = 0
+        self.last_active = time.monotonic()
+
+        self.agent = ZepConversableAgent(
+            name="ZEP SUPPORT" if is_support_mode else "ZEP AGENT",
+            system_message=build_system_message(is_support_mode),
+            llm_config={"config_list": config_list},
+            zep_session_id=session_id,
+            zep_client=zep,
+            min_fact_rating=0.7,
+            function_map=None,
+            human_input_mode="NEVER",
+            generation_policy=generation_policies["support" if is_support_mode else "assistant"],
+        )
+        self.user = UserProxyAgent(
+            name="UserProxy",
+            human_input_mode="NEVER",
+            max_consecutive_auto_reply=0,
+            code_execution_config=False,
+            llm_config=False,
+        )
+
+    async def handle_turn(self, prompt, on_chunk):
+        """
+        Process one user message, streaming visible reply text to on_chunk.
+
+        Returns:
+            str: The cleaned assistant response
+        """
+        async with self.lock:
+            self.last_active = time.monotonic()
+            self.refresh_system_message()
+            await self.agent._a_zep_persist_user_message(
+                prompt, user_name=self.display_name.upper()
+            )
+            await self.agent._a_zep_fetch_and_update_system_message()
+
+            think_filter = ThinkStreamFilter()
+
+            def forward(chunk):
+                visible = think_filter.feed(chunk)
+                if visible:
+                    on_chunk(visible)
+
+            try:
+                full_response = await self.agent.a_stream_turn(
+                    self.user, f"{prompt}{NO_THINK_SUFFIX}", forward
+                )
+            finally:
+                # Drop this turn's memory context, so between turns the session
+                # only references the system message shared by all sessions
+                self.agent.update_system_message(self.agent.original_system_message)
+            self.last_active = time.monotonic()
+            return strip_think_blocks(full_response or "") or "Sorry, I couldn't generate a response."
+
+
+    def refresh_system_message(self):
+        """Pick up the current system message, which changes with the hot-reloaded knowledge base."""
+        self.agent.original_system_message = build_system_message(self.is_support_mode)
+
+    def is_idle(self, ttl, now=None):
+        """Whether the session has no socket, no running turn and no activity for ttl seconds."""
+        now = now or time.monotonic()
+        return not self.sockets and not self.lock.locked() and now - self.last_active > ttl
+
+
+async def evict_idle_sessions(sessions, ttl=SESSION_IDLE_TTL):
+    """
+    Drop idle sessions once their pending Zep writes have landed.
+
+    Returns:
+        int: Number of sessions evicted
+    """
+    now = time.monotonic()
+    idle = [sid for sid, session in sessions.items() if session.is_idle(ttl, now)]
+    for session_id in idle:
+        session = sessions.pop(session_id)
+        try:
+            await session.agent.a_flush_zep_writes()
+        except Exception as e:
+            print(f"Failed to flush Zep writes for session {session_id}: {e}")
+    return len(idle)
+
+
+class BaseHandler(RequestHandler):
+    """JSON request/response helpers shared by the HTTP handlers."""
+
+    @property
+    def zep(self):
+        return self.application.settings["zep"]
+
+    @property
+    def sessions(self):
+        return self.application.settings["sessions"]
+
+    @property
+    def ticket_index(self):
+        return self.application.settings["ticket_index"]
+
+    def json_body(self):
+        try:
+            return json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError:
+            raise HTTPError(400, reason="Request body must be JSON")
+
+    def write_error(self, status_code, **kwargs):
+        self.finish({"error": self._reason})
+
+
+class SessionHandler(BaseHandler):
+    """POST /sessions - initialize a Zep user and chat session."""
+
+    async def post(self):
+        body = self.json_body()
+        first_name = body.get("first_name", "").strip()
+        last_name = body.get("last_name", "").strip()
+        if not first_name or not last_name:
+            raise HTTPError(400, reason="first_name and last_name are required")
+
+        is_support_mode = body.get("mode") == "support"
+        customer_key = body.get("customer_key")
+        directory = self.application.settings["identities"]
+        user_id, user_known = directory.resolve(first_name, last_name, customer_key)
+        session_id = body.get("ticket_id") or str(uuid.uuid4())
+
+        try:
+            user_exists = await a_ensure_user_session(
+                self.zep, user_id, first_name, last_name, session_id, user_known=user_known
+            )
+        except Exception as e:
+            raise HTTPError(502, reason=f"Failed to initialize Zep user/session: {e}")
+        directory.mark_known(first_name, last_name, customer_key)
+
+        self.sessions[session_id] = ChatSession(
+            self.zep,
+            session_id,
+            user_id,
+            f"{first_name} {last_name}",
+            is_support_mode,
+            ticket_id=body.get("ticket_id"),
+        )
+        self.set_status(201)
+        self.write({
+            "session_id": session_id,
+            "user_id": user_id,
+            "user_exists": user_exists,
+            "mode": "support" if is_support_mode else "assistant",
+            "welcome": WELCOME_MESSAGES[is_support_mode],
+        })
+
+
+class UserTicketsHandler(BaseHandler):
+    """GET /users/{user_id}/tickets - list a user's support tickets."""
+
+    async def get(self, user_id):
+        try:
+            tickets = await a_list_user_tickets(self.zep, user_id)
+        except Exception as e:
+            raise HTTPError(502, reason=f"Failed to retrieve tickets: {e}")
+        self.write({"tickets": tickets})
+
+
+class TicketsHandler(BaseHandler):
+    """
+    POST /tickets - create a support ticket.
+
+    When open tickets already describe the same issue, nothing is created and
+    the response is 409 with the candidates in "duplicates"; send "force": true
+    to create the ticket anyway, or POST /tickets/{ticket_id}/attach to join one.
+    """
+
+    async def post(self):
+        body = self.json_body()
+        user_id = body.get("user_id")
+        issue_title = body.get("issue_title")
+        issue_description = body.get("issue_description")
+        if not user_id or not issue_title or not issue_description:
+            raise HTTPError(400, reason="user_id, issue_title and issue_description are required")
+
+        if not body.get("force"):
+            duplicates = self.ticket_index.find_duplicates(issue_title, issue_description)
+            if duplicates:
+                self.set_status(409)
+                self.write({"ticket_id": None, "duplicates": duplicates})
+                return
+
+        try:
+            ticket_id = await a_create_ticket(self.zep, user_id, issue_title, issue_description)
+        except Exception as e:
+            raise HTTPError(502, reason=f"Failed to create ticket: {e}")
+        self.ticket_index.add(ticket_id, issue_title, issue_description)
+        self.set_status(201)
+        self.write({"ticket_id": ticket_id})
+
+
+class TicketAttachHandler(BaseHandler):
+    """POST /tickets/{ticket_id}/attach - attach a user to an existing ticket."""
+
+    async def post(self, ticket_id):
+        user_id = self.json_body().get("user_id")
+        if not user_id:
+            raise HTTPError(400, reason="user_id is required")
+
+        try:
+            metadata = await a_attach_to_ticket(self.zep, ticket_id, user_id)
+        except Exception as e:
+            raise HTTPError(502, reason=f"Failed to attach to ticket: {e}")
+        if metadata is None:
+            raise HTTPError(404, reason="Ticket not found")
+        self.write(metadata)
+
+
+class TicketHandler(BaseHandler):
+    """GET /tickets/{ticket_id} and PATCH /tickets/{ticket_id}."""
+
+    async def get(self, ticket_id):
+        try:
+            session = await self.zep.memory.get_session(ticket_id)
+        except Exception as e:
+            raise HTTPError(404, reason=f"Ticket not found: {e}")
+        self.write(extract_ticket_info(session))
+
+    async def patch(self, ticket_id):
+        body = self.json_body()
+        new_status = body.get("status")
+        resolution = body.get("resolution")
+        if new_status not in TICKET_STATUSES:
+            raise HTTPError(400, reason=f"status must be one of {TICKET_STATUSES}")
+
+        try:
+            metadata = await a_set_ticket_status(self.zep, ticket_id, new_status, resolution)
+        except Exception as e:
+            raise HTTPError(502, reason=f"Failed to update ticket status: {e}")
+        if metadata is None:
+            raise HTTPError(404, reason="Ticket not found")
+        self.ticket_index.update(ticket_id, status=new_status, resolution=resolution)
+        self.write(metadata)
+
+
+class ChatSocket(WebSocketHandler):
+    """
+    WS /sessions/{session_id}/chat - streaming chat.
+
+    Client sends {"content": "...", "profile": false}; server replies with
+    {"type": "chunk"} messages followed by one {"type": "message"} (or
+    {"type": "error"}). Profiled turns report the profile file in "profile";
+    "profile" from the client is ignored unless the server sets PROFILE_REQUESTS.
+    """
+
+    def open(self, session_id):
+        self.session = self.application.settings["sessions"].get(session_id)
+        if self.session is None:
+            self.close(code=4404, reason="Unknown session")
+            return
+        self.session.sockets += 1
+
+    def on_close(self):
+        if getattr(self, "session", None) is not None:
+            self.session.sockets -= 1
+            self.session.last_active = time.monotonic()
+
+    async def on_message(self, raw):
+        try:
+            payload = json.loads(raw)
+            prompt = payload.get("content", "").strip()
+        except (json.JSONDecodeError, AttributeError):
+            payload, prompt = {}, ""
+        if not prompt:
+            self.send({"type": "error", "error": "content is required"})
+            return
+
+        residency = self.application.settings.get("residency")
+        was_warm = residency.is_warm() if residency else True
+        turn_start = time.monotonic()
+
+        profiling = profile_turn(
+            self.session.session_id,
+            self.session.ticket_id,
+            enabled=should_profile(PROFILE_REQUESTS and payload.get("profile", False)),
+        )
+        try:
+            with profiling as profile:
+                response = await self.session.handle_turn(
+                    prompt, lambda chunk: self.send({"type": "chunk", "content": chunk})
+                )
+        except Exception as e:
+            self.send({"type": "error", "error": f"Error during chat: {e}"})
+            return
+        if residency:
+            residency.record_turn(
+                time.monotonic() - turn_start, was_warm, self.session.agent.last_generation_stats
+            )
+        self.send({"type": "message", "content": response, "profile": profile["path"]})
+
+    def send(self, payload):
+        try:
+            self.write_message(payload)
+        except WebSocketClosedError:
+            pass
+
+
+def make_app(zep, residency=None, identities=None, ticket_index=None):
+    """Create the tornado application around an AsyncZep client."""
+    return Application(
+        [
+            (r"/sessions", SessionHandler),
+            (r"/sessions/([^/]+)/chat", ChatSocket),
+            (r"/tickets", TicketsHandler),
+            (r"/tickets/([^/]+)", TicketHandler),
+            (r"/tickets/([^/]+)/attach", TicketAttachHandler),
+            (r"/users/([^/]+)/tickets", UserTicketsHandler),
+        ],
+        zep=zep,
+        sessions={},
+        residency=residency,
+        identities=identities or IdentityDirectory(default_directory_path()),
+        ticket_index=ticket_index or TicketIndex(),
+    )
+
+
+async def serve(port, api_key):
+    """Run the API server until cancelled."""
+    if os.environ.get("KB_HOT_RELOAD"):
+        enable_knowledge_base_hot_reload()
+    residency = ModelResidency(config_list[0]).start()
+    zep = SingleFlightZep(ResilientZep(AsyncZep(api_key=api_key)))
+
+    ticket_index = TicketIndex()
+    try:
+        ticket_index.load_sessions([session async for session in a_iter_ticket_sessions(zep)])
+    except Exception as e:
+        print(f"Failed to load tickets into the duplicate index: {e}")
+
+    app = make_app(zep, residency, ticket_index=ticket_index)
+    sessions = app.settings["sessions"]
+    PeriodicCallback(lambda: evict_idle_sessions(sessions), 60 * 1000).start()
+    app.listen(port)
+    print(f"Zep support API listening on :{port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Async API server for the Zep support agent")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    args = parser.parse_args()
+
+    api_key = os.environ.get("ZEP_API_KEY")
+    if not api_key:
+        parser.error("ZEP_API_KEY environment variable is required")
+
+    asyncio.run(serve(args.port, api_key))
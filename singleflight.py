@@ -0,0 +1,137 @@
+"""
+Single-flight coalescing for Zep reads.
+
+When several threads (or coroutines) ask for the same key at the same time -
+e.g. one ticket open in several tabs - only the first caller hits Zep and the
+others wait for and share its result. Nothing is cached once the call returns.
+"""
+import asyncio
+import inspect
+import threading
+
+
+class _Call:
+    """An in-flight call that followers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-based single-flight group."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Run fn() unless a call for key is already in flight, then share its outcome.
+
+        Args:
+            key: Hashable identity of the request
+            fn (callable): Performs the request
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """asyncio single-flight group, for use on one event loop."""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        """Async version of SingleFlight.do; fn returns an awaitable."""
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+        # A cancelled caller must not cancel the call other callers share
+        return await asyncio.shield(future)
+
+
+def _request_key(operation, args, kwargs):
+    """Build a hashable key for a request, or None if the arguments are unhashable."""
+    key = (operation, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class _CoalescedClient:
+    """Wrap a Zep sub-client so selected read methods go through a single-flight group."""
+
+    def __init__(self, client, flight, name, methods):
+        self._client = client
+        self._flight = flight
+        for method in methods:
+            setattr(self, method, self._coalesced(f"{name}.{method}", getattr(client, method)))
+
+    def _coalesced(self, operation, method):
+        if inspect.iscoroutinefunction(method):
+            async def call(*args, **kwargs):
+                key = _request_key(operation, args, kwargs)
+                if key is None:
+                    return await method(*args, **kwargs)
+                return await self._flight.do(key, lambda: method(*args, **kwargs))
+        else:
+            def call(*args, **kwargs):
+                key = _request_key(operation, args, kwargs)
+                if key is None:
+                    return method(*args, **kwargs)
+                return self._flight.do(key, lambda: method(*args, **kwargs))
+        return call
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class SingleFlightZep:
+    """
+    Zep client wrapper that coalesces concurrent identical reads.
+
+    Coalesces memory.get, memory.get_session, memory.list_sessions and user.get;
+    everything else is passed through to the wrapped Zep or AsyncZep client.
+    """
+
+    def __init__(self, zep):
+        self._zep = zep
+        is_async = inspect.iscoroutinefunction(zep.memory.get)
+        flight = AsyncSingleFlight() if is_async else SingleFlight()
+        self.memory = _CoalescedClient(
+            zep.memory, flight, "memory", ["get", "get_session", "list_sessions"]
+        )
+        self.user = _CoalescedClient(zep.user, flight, "user", ["get"])
+
+    def __getattr__(self, name):
+        return getattr(self._zep, name)
@@ -0,0 +1,350 @@
+import re
+from datetime import datetime
+from zep_cloud import FactRatingExamples, FactRatingInstruction, Message
+from prompt import agent_system_message, customer_support_system_message
+from util import load_support_knowledge_base
+
+
+# Suffix appended to every user prompt to disable qwen3's reasoning mode
+NO_THINK_SUFFIX = " /no_think"
+
+THINK_BLOCK_PATTERN = re.compile(r"<think>.*?</think>", flags=re.DOTALL)
+
+WELCOME_MESSAGES = {
+    True: "Welcome to our Customer Support! 🎫 How can I assist you today?",
+    False: "Welcome! 😊 How can I assist you today?",
+}
+
+TICKET_STATUSES = ["open", "closed", "resolved", "pending"]
+
+# Fact rating instructions shared by every Zep user we create
+FACT_RATING_INSTRUCTION = FactRatingInstruction(
+    instruction="""Rate facts by relevance and utility. Highly relevant
+            facts directly impact the user's current needs or represent core preferences that
+            affect multiple interactions. Low relevance facts are incidental details that
+            rarely influence future conversations or decisions.""",
+    examples=FactRatingExamples(
+        high="The user has had multiple issues with their account login in the past month.",
+        medium="The user prefers email communication over phone calls.",
+        low="The user mentioned they were using Chrome browser yesterday.",
+    ),
+)
+
+
+# (knowledge base text, support system message built from it)
+_support_message = (None, None)
+
+
+def build_system_message(is_support_mode=False):
+    """
+    Build the agent system message for the given mode.
+    Support mode embeds the knowledge base after the support prompt; it is
+    rebuilt only when the knowledge base changes, so every agent built from
+    the same knowledge base version shares one string.
+
+    Args:
+        is_support_mode (bool): Whether the agent handles support tickets
+
+    Returns:
+        str: System message for ZepConversableAgent
+    """
+    global _support_message
+    if not is_support_mode:
+        return agent_system_message
+
+    kb = load_support_knowledge_base()
+    built_from, message = _support_message
+    if kb is not built_from:
+        message = f"{customer_support_system_message}\n\n## KNOWLEDGE BASE:\n{kb}"
+        _support_message = (kb, message)
+    return message
+
+
+def strip_think_blocks(text):
+    """Remove <think> </think> blocks from a model response."""
+    return THINK_BLOCK_PATTERN.sub("", text).strip()
+
+
+def run_turn(agent, user, prompt, user_name, silent=False):
+    """
+    Run one blocking conversation turn through a ZepConversableAgent.
+
+    Args:
+        agent: ZepConversableAgent on a sync Zep client
+        user: UserProxyAgent driving the chat
+        prompt (str): User message
+        user_name (str): Name stored with the user message in Zep
+        silent (bool): Suppress autogen's console output
+
+    Returns:
+        str: The cleaned assistant response
+    """
+    # Persist user message and update system message with facts
+    agent._zep_persist_user_message(prompt, user_name=user_name)
+    agent._zep_fetch_and_update_system_message()
+
+    # Initiate chat with single turn
+    user.initiate_chat(
+        recipient=agent,
+        message=f"{prompt}{NO_THINK_SUFFIX}",
+        max_turns=1,
+        clear_history=False,
+        silent=silent,
+    )
+
+    full_response = user.last_message(agent).get("content", "...")
+    if not full_response or full_response == "...":
+        full_response = "Sorry, I couldn't generate a response."
+
+    return strip_think_blocks(full_response)
+
+
+def ensure_user_session(zep, user_id, first_name, last_name, session_id, user_known=False):
+    """
+    Make sure the Zep user exists and attach a session to it.
+
+    Args:
+        zep: Zep client
+        user_id (str): Zep user ID
+        first_name (str): User's first name
+        last_name (str): User's last name
+        session_id (str): Session (or ticket) ID to add
+        user_known (bool): The identity directory already saw this user in Zep,
+            so the user lookup/creation round trips are skipped
+
+    Returns:
+        bool: True if the user already existed
+    """
+    user_exists = user_known
+    try:
+        if not user_known:
+            zep.user.get(user_id)
+            user_exists = True
+    except Exception:
+        # User doesn't exist, create a new one
+        zep.user.add(
+            first_name=first_name,
+            last_name=last_name,
+            user_id=user_id,
+            fact_rating_instruction=FACT_RATING_INSTRUCTION,
+        )
+
+    zep.memory.add_session(user_id=user_id, session_id=session_id)
+    return user_exists
+
+
+async def a_ensure_user_session(zep, user_id, first_name, last_name, session_id, user_known=False):
+    """Async version of ensure_user_session for an AsyncZep client."""
+    user_exists = user_known
+    try:
+        if not user_known:
+            await zep.user.get(user_id)
+            user_exists = True
+    except Exception:
+        await zep.user.add(
+            first_name=first_name,
+            last_name=last_name,
+            user_id=user_id,
+            fact_rating_instruction=FACT_RATING_INSTRUCTION,
+        )
+
+    await zep.memory.add_session(user_id=user_id, session_id=session_id)
+    return user_exists
+
+
+def new_ticket(user_id, issue_title, issue_description):
+    """
+    Build the ticket ID, session metadata and first message for a new ticket.
+
+    Args:
+        user_id (str): Zep user ID of the ticket owner
+        issue_title (str): Short title of the issue
+        issue_description (str): Full issue description
+
+    Returns:
+        tuple: (ticket_id, metadata, first_message)
+    """
+    # Generate a ticket ID with timestamp for uniqueness
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    ticket_id = f"TICKET-{timestamp}-{user_id[:5]}"
+
+    metadata = {
+        "ticket_id": ticket_id,
+        "created_at": datetime.now().isoformat(),
+        "status": "open",
+        "issue_title": issue_title,
+        "issue_description": issue_description,  # Lets the duplicate index rebuild from metadata
+        "issue_type": "customer_support",
+        "user_id": user_id,  # Add user_id to metadata for filtering
+    }
+
+    message = Message(
+        role_type="user",
+        role=user_id,
+        content=f"TICKET DESCRIPTION: {issue_description}",
+    )
+
+    return ticket_id, metadata, message
+
+
+def ticket_summary(metadata):
+    """Convert ticket session metadata into the ticket dict used by the views."""
+    return {
+        "ticket_id": metadata["ticket_id"],
+        "created_at": metadata.get("created_at", "Unknown"),
+        "status": metadata.get("status", "open"),
+        "issue_title": metadata.get("issue_title", "Untitled Issue"),
+    }
+
+
+def is_user_ticket(metadata, user_id):
+    """Check if session metadata describes a support ticket owned by or attached to user_id."""
+    return bool(
+        metadata and
+        (metadata.get("user_id") == user_id or user_id in metadata.get("attached_users", [])) and
+        "ticket_id" in metadata and
+        metadata.get("issue_type") == "customer_support"
+    )
+
+
+def filter_user_tickets(sessions, user_id):
+    """Select the support tickets that belong to user_id from a session list."""
+    return [
+        ticket_summary(session.metadata)
+        for session in sessions
+        if is_user_ticket(session.metadata, user_id)
+    ]
+
+
+def status_update(metadata, new_status, resolution=None):
+    """Return a copy of ticket metadata with a new status (and resolution) and update time."""
+    metadata = dict(metadata)
+    metadata["status"] = new_status
+    if resolution:
+        metadata["resolution"] = resolution
+    metadata["updated_at"] = datetime.now().isoformat()
+    return metadata
+
+
+def attachment_update(metadata, user_id):
+    """Return a copy of ticket metadata with user_id attached to the ticket."""
+    metadata = dict(metadata)
+    attached = list(metadata.get("attached_users", []))
+    if user_id != metadata.get("user_id") and user_id not in attached:
+        attached.append(user_id)
+    metadata["attached_users"] = attached
+    metadata["updated_at"] = datetime.now().isoformat()
+    return metadata
+
+
+def create_ticket(zep, user_id, issue_title, issue_description):
+    """Create a ticket session in Zep and return its ticket ID."""
+    ticket_id, metadata, message = new_ticket(user_id, issue_title, issue_description)
+    zep.memory.add_session(user_id=user_id, session_id=ticket_id, metadata=metadata)
+    zep.memory.add(session_id=ticket_id, messages=[message])
+    return ticket_id
+
+
+async def a_create_ticket(zep, user_id, issue_title, issue_description):
+    """Async version of create_ticket for an AsyncZep client."""
+    ticket_id, metadata, message = new_ticket(user_id, issue_title, issue_description)
+    await zep.memory.add_session(user_id=user_id, session_id=ticket_id, metadata=metadata)
+    await zep.memory.add(session_id=ticket_id, messages=[message])
+    return ticket_id
+
+
+def list_user_tickets(zep, user_id):
+    """List the support tickets owned by user_id."""
+    response = zep.memory.list_sessions()
+    return filter_user_tickets(response.sessions or [], user_id)
+
+
+async def a_list_user_tickets(zep, user_id):
+    """Async version of list_user_tickets for an AsyncZep client."""
+    response = await zep.memory.list_sessions()
+    return filter_user_tickets(response.sessions or [], user_id)
+
+
+def set_ticket_status(zep, ticket_id, new_status, resolution=None):
+    """
+    Update the status (and optionally the resolution) of a support ticket.
+
+    Returns:
+        dict: Updated metadata, or None if the ticket has no metadata
+    """
+    session = zep.memory.get_session(ticket_id)
+    if not session or not session.metadata:
+        return None
+
+    metadata = status_update(session.metadata, new_status, resolution)
+    zep.memory.update_session(session_id=ticket_id, metadata=metadata)
+    return metadata
+
+
+async def a_set_ticket_status(zep, ticket_id, new_status, resolution=None):
+    """Async version of set_ticket_status for an AsyncZep client."""
+    session = await zep.memory.get_session(ticket_id)
+    if not session or not session.metadata:
+        return None
+
+    metadata = status_update(session.metadata, new_status, resolution)
+    await zep.memory.update_session(session_id=ticket_id, metadata=metadata)
+    return metadata
+
+
+def attach_to_ticket(zep, ticket_id, user_id):
+    """
+    Attach a user to an existing ticket, e.g. one already tracking their incident.
+
+    Returns:
+        dict: Updated metadata, or None if the ticket has no metadata
+    """
+    session = zep.memory.get_session(ticket_id)
+    if not session or not session.metadata:
+        return None
+
+    metadata = attachment_update(session.metadata, user_id)
+    zep.memory.update_session(session_id=ticket_id, metadata=metadata)
+    return metadata
+
+
+async def a_attach_to_ticket(zep, ticket_id, user_id):
+    """Async version of attach_to_ticket for an AsyncZep client."""
+    session = await zep.memory.get_session(ticket_id)
+    if not session or not session.metadata:
+        return None
+
+    metadata = attachment_update(session.metadata, user_id)
+    await zep.memory.update_session(session_id=ticket_id, metadata=metadata)
+    return metadata
+
+
+class ThinkStreamFilter:
+    """
+    Incrementally strip <think> blocks from a streamed model response.
+    Text inside an unfinished think block, or a partial opening tag, is held back.
+    """
+
+    OPEN_TAG = "<think>"
+
+    def __init__(self):
+        self._text = ""
+        self._sent = 0
+
+    def feed(self, chunk):
+        """Add a streamed chunk and return the newly visible text."""
+        self._text += chunk
+        visible = THINK_BLOCK_PATTERN.sub("", self._text).lstrip()
+
+        open_at = visible.find(self.OPEN_TAG)
+        if open_at != -1:
+            visible = visible[:open_at]
+        else:
+            for n in range(len(self.OPEN_TAG) - 1, 0, -1):
+                if visible.endswith(self.OPEN_TAG[:n]):
+                    visible = visible[:-n]
+                    break
+
+        delta = visible[self._sent:]
+        self._sent = max(self._sent, len(visible))
+        return delta
@@ -0,0 +1,200 @@
+"""
+Near-duplicate detection for support tickets.
+
+During an outage many users file nearly the same ticket. Each ticket is reduced
+to a MinHash signature over its title and description words, and the
+signatures are bucketed with LSH banding, so finding similar open tickets for a
+new submission is a few dictionary lookups rather than a scan. Candidates are
+then checked against the exact Jaccard similarity of their shingle sets, which
+are kept in the index: a 32-hash estimate is too noisy (about +/-0.09) to apply
+the threshold to directly.
+
+The index is in memory; it is filled from the ticket sessions in Zep at
+start-up and kept current as tickets are created or change status.
+"""
+import random
+import re
+import threading
+import unicodedata
+import zlib
+
+
+# Mersenne prime for the universal hash family h(x) = (a*x + b) mod p
+_PRIME = (1 << 61) - 1
+_WORD_PATTERN = re.compile(r"\w+")
+# Tickets still being worked on; closed and resolved tickets are not offered
+ACTIVE_STATUSES = ("open", "pending")
+# Words considered per ticket, which bounds the cost of a lookup
+MAX_WORDS = 64
+
+
+def _is_wide(word):
+    return all(unicodedata.east_asian_width(c) in ("W", "F") for c in word)
+
+
+def tokens(text):
+    """
+    Split text into words in any script. Runs of CJK characters, which are
+    written without spaces, are split into overlapping character pairs.
+    """
+    result = []
+    for word in _WORD_PATTERN.findall(text.casefold()):
+        if len(word) > 2 and _is_wide(word):
+            result.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            result.append(word)
+    return result
+
+
+def shingles(title, description):
+    """Hash the words and word pairs of a ticket into a set of shingle IDs."""
+    words = tokens(f"{title} {description}")[:MAX_WORDS]
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return {zlib.crc32(gram.encode()) for gram in grams}
+
+
+class TicketIndex:
+    """
+    MinHash/LSH index of ticket titles and descriptions.
+
+    Args:
+        num_perm (int): Hash functions per signature
+        bands (int): LSH bands; with num_perm=32 and 16 bands of two rows, a
+            ticket at 0.5 similarity shares a bucket with ~99% probability
+        threshold (float): Minimum Jaccard similarity of the shingle sets to
+            report a duplicate
+        seed (int): Seed for the hash functions, fixed so signatures are stable
+    """
+
+    def __init__(self, num_perm=32, bands=16, threshold=0.5, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._buckets = [{} for _ in range(bands)]
+        # ticket_id -> {"signature", "shingles", "issue_title", "status", "resolution"}
+        self._tickets = {}
+
+    def signature(self, title, description):
+        """MinHash signature of a ticket, or None when it has no words to compare."""
+        return self._signature(shingles(title, description))
+
+    def _signature(self, ids):
+        if not ids:
+            return None
+        return tuple(min((a * x + b) % _PRIME for x in ids) for a, b in self._perms)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [signature[i * rows:(i + 1) * rows] for i in range(self.bands)]
+
+    def add(self, ticket_id, title, description, status="open", resolution=None):
+        """Index a ticket, replacing any earlier entry for the same ID."""
+        ids = frozenset(shingles(title, description))
+        signature = self._signature(ids)
+        with self._lock:
+            self._remove(ticket_id)
+            self._tickets[ticket_id] = {
+                "signature": signature,
+                "shingles": ids,
+                "issue_title": title,
+                "status": status,
+                "resolution": resolution,
+            }
+            if signature is None:
+                return
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                bucket.setdefault(key, set()).add(ticket_id)
+
+    def _remove(self, ticket_id):
+        entry = self._tickets.pop(ticket_id, None)
+        if entry is None or entry["signature"] is None:
+            return
+        for bucket, key in zip(self._buckets, self._band_keys(entry["signature"])):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(ticket_id)
+                if not members:
+                    del bucket[key]
+
+    def remove(self, ticket_id):
+        """Drop a ticket from the index."""
+        with self._lock:
+            self._remove(ticket_id)
+
+    def update(self, ticket_id, status=None, resolution=None):
+        """Record a status change or resolution for an indexed ticket."""
+        with self._lock:
+            entry = self._tickets.get(ticket_id)
+            if entry is None:
+                return
+            if status is not None:
+                entry["status"] = status
+            if resolution is not None:
+                entry["resolution"] = resolution
+
+    def find_duplicates(self, title, description, limit=3):
+        """
+        Find active tickets that look like the same issue.
+
+        Args:
+            title (str): Title of the ticket being submitted
+            description (str): Its description
+            limit (int): Maximum matches to return
+
+        Returns:
+            list: Dicts with ticket_id, issue_title, status, resolution and
+                similarity, most similar first
+        """
+        ids = shingles(title, description)
+        signature = self._signature(ids)
+        if signature is None:
+            return []
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(key, ()))
+
+            matches = []
+            for ticket_id in candidates:
+                entry = self._tickets[ticket_id]
+                if entry["status"] not in ACTIVE_STATUSES:
+                    continue
+                similarity = len(ids & entry["shingles"]) / len(ids | entry["shingles"])
+                if similarity >= self.threshold:
+                    matches.append({
+                        "ticket_id": ticket_id,
+                        "issue_title": entry["issue_title"],
+                        "status": entry["status"],
+                        "resolution": entry["resolution"],
+                        "similarity": round(similarity, 2),
+                    })
+
+        matches.sort(key=lambda m: m["similarity"], reverse=True)
+        return matches[:limit]
+
+    def load_sessions(self, sessions):
+        """Index the support tickets in a Zep session list. Returns the count indexed."""
+        count = 0
+        for session in sessions:
+            metadata = session.metadata or {}
+            if metadata.get("issue_type") != "customer_support" or "ticket_id" not in metadata:
+                continue
+            self.add(
+                metadata["ticket_id"],
+                metadata.get("issue_title", ""),
+                metadata.get("issue_description", ""),
+                status=metadata.get("status", "open"),
+                resolution=metadata.get("resolution"),
+            )
+            count += 1
+        return count
+
+    def __len__(self):
+        return len(self._tickets)
@@ -0,0 +1,394 @@
+"""
+Traffic capture and replay for performance regression testing.
+
+Capture: set TRAFFIC_CAPTURE=/path/trace.jsonl when running the app. Each turn
+is written as one anonymized JSON line - arrival time, prompt size, the Zep
+calls made during the turn with their latencies, and LLM token counts. Session
+IDs are salted hashes and no message content is stored. Zep calls outside a
+turn (ticket functions) are written as their own 'zep' records. Turns run in
+TurnPool workers collect their Zep calls with a ZepCallLog in the worker and
+hand them back to be attached to the turn's trace.
+
+Replay: re-drives the recorded turns through support.run_turn at the original
+or a scaled rate, against a FakeZep that sleeps for the recorded latencies and
+a local stand-in Ollama server that streams the recorded number of tokens.
+The system message is sized so the prompt has the recorded prompt token count:
+
+    python traffic.py trace.jsonl --speed 2.0
+
+Add --resilient to route the FakeZep reads through resilient.ResilientZep and
+compare tail latency with and without hedging and adaptive timeouts.
+"""
+import argparse
+import contextvars
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from autogen import UserProxyAgent
+from agent import ZepConversableAgent
+from llm_config import generation_policies
+from resilient import CallPolicy, ResilientZep
+from support import run_turn
+
+
+# Trace of the turn running in the current thread/task, if any
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+# Characters per prompt token, as counted by the stand-in Ollama server
+CHARS_PER_TOKEN = 4
+# Replayed system message size for traces without LLM token counts
+DEFAULT_SYSTEM_CHARS = 2000
+
+
+def _zep_call(operation, ms, failed):
+    call = {"op": operation, "ms": round(ms, 1)}
+    if failed:
+        call["error"] = True
+    return call
+
+
+class TraceRecorder:
+    """
+    Append anonymized turn traces to a JSONL file.
+
+    Args:
+        path (str): Trace file, appended to
+        salt (str): Salt for hashing session IDs, random per recorder by default
+    """
+
+    def __init__(self, path, salt=None):
+        self.path = path
+        self.salt = salt or uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._file = open(path, "a")
+
+    def anonymize(self, value):
+        return hashlib.sha256(f"{self.salt}:{value}".encode()).hexdigest()[:16]
+
+    def write(self, record):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    @contextmanager
+    def turn(self, session_id, is_support_mode, prompt):
+        """
+        Record one turn. Zep calls made inside the block are attached to it;
+        the caller may set trace['llm'] to the agent's generation stats.
+        """
+        trace = {
+            "kind": "turn",
+            "ts": round(time.time(), 3),
+            "session": self.anonymize(session_id),
+            "mode": "support" if is_support_mode else "assistant",
+            "prompt_chars": len(prompt),
+            "zep_calls": [],
+            "llm": None,
+        }
+        token = _current_trace.set(trace)
+        start = time.monotonic()
+        try:
+            yield trace
+        except Exception:
+            trace["error"] = True
+            raise
+        finally:
+            trace["turn_ms"] = round((time.monotonic() - start) * 1000, 1)
+            _current_trace.reset(token)
+            self.write(trace)
+
+    def record_zep_call(self, operation, ms, failed):
+        call = _zep_call(operation, ms, failed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace["zep_calls"].append(call)
+        else:
+            self.write({"kind": "zep", "ts": round(time.time(), 3), **call})
+
+
+class ZepCallLog:
+    """
+    Collect Zep calls for turns that run away from the TraceRecorder (in
+    TurnPool workers); the caller attaches them to the turn's trace.
+    Use as the recorder of a RecordingZep.
+    """
+
+    @contextmanager
+    def turn(self):
+        """Collect the Zep calls made inside the block into the yielded list."""
+        calls = []
+        token = _current_trace.set({"zep_calls": calls})
+        try:
+            yield calls
+        finally:
+            _current_trace.reset(token)
+
+    def record_zep_call(self, operation, ms, failed):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace["zep_calls"].append(_zep_call(operation, ms, failed))
+
+
+class _RecordingClient:
+    """Wrap a Zep sub-client and time every method call."""
+
+    def __init__(self, client, recorder, name):
+        self._client = client
+        self._recorder = recorder
+        self._name = name
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            start = time.monotonic()
+            failed = True
+            try:
+                result = method(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self._recorder.record_zep_call(
+                    f"{self._name}.{name}", (time.monotonic() - start) * 1000, failed
+                )
+        return call
+
+
+class RecordingZep:
+    """Sync Zep client wrapper that records memory.* and user.* calls to a TraceRecorder."""
+
+    def __init__(self, zep, recorder):
+        self._zep = zep
+        self.memory = _RecordingClient(zep.memory, recorder, "memory")
+        self.user = _RecordingClient(zep.user, recorder, "user")
+
+    def __getattr__(self, name):
+        return getattr(self._zep, name)
+
+
+def load_traces(path):
+    """Read turn records from a trace file, ordered by arrival time."""
+    with open(path, "r") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted((r for r in records if r.get("kind") == "turn"), key=lambda r: r["ts"])
+
+
+def latency_pool_of(zep_calls, latency_scale=1.0):
+    """Group recorded Zep call latencies (scaled, in seconds) by operation."""
+    pool = defaultdict(list)
+    for call in zep_calls:
+        pool[call["op"]].append(call["ms"] / 1000 * latency_scale)
+    return pool
+
+
+class FakeZep:
+    """
+    Local Zep stand-in. Each call sleeps for the next recorded latency of its
+    operation (scaled), then returns an empty-but-valid response. Calls beyond
+    the recorded ones (hedges, retries) sleep for a latency drawn at random
+    from latency_pool, by default the operation's recorded latencies.
+    """
+
+    def __init__(self, zep_calls=(), latency_scale=1.0, latency_pool=None):
+        self._latencies = defaultdict(deque)
+        for call in zep_calls:
+            self._latencies[call["op"]].append(call["ms"] / 1000 * latency_scale)
+        self._pool = latency_pool or latency_pool_of(zep_calls, latency_scale)
+        self.memory = SimpleNamespace(
+            get=self._op("memory.get", SimpleNamespace(context=None)),
+            add=self._op("memory.add", None),
+            add_session=self._op("memory.add_session", None),
+            get_session=self._op("memory.get_session", SimpleNamespace(metadata={})),
+            update_session=self._op("memory.update_session", None),
+            list_sessions=self._op("memory.list_sessions", SimpleNamespace(sessions=[])),
+        )
+        self.user = SimpleNamespace(
+            get=self._op("user.get", None),
+            add=self._op("user.add", None),
+        )
+
+    def _op(self, operation, result):
+        def call(*args, **kwargs):
+            latencies = self._latencies[operation]
+            if latencies:
+                time.sleep(latencies.popleft())
+            elif self._pool.get(operation):
+                time.sleep(random.choice(self._pool[operation]))
+            return result
+        return call
+
+
+class _StandInOllamaHandler(BaseHTTPRequestHandler):
+    """Answer /api/chat with N tokens, where the model name is 'replay-N'."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        tokens = int(body["model"].rsplit("-", 1)[-1])
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+        delay = self.server.token_delay
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        final = {
+            "model": body["model"],
+            "done": True,
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": tokens,
+        }
+        if not body.get("stream", True):
+            time.sleep(delay * tokens)
+            content = "tok " * tokens
+            self.wfile.write(json.dumps({**final, "message": {"role": "assistant", "content": content}}).encode())
+            return
+
+        for _ in range(tokens):
+            time.sleep(delay)
+            chunk = {"model": body["model"], "done": False, "message": {"role": "assistant", "content": "tok "}}
+            self.wfile.write((json.dumps(chunk) + "\n").encode())
+            self.wfile.flush()
+        self.wfile.write((json.dumps({**final, "message": {"role": "assistant", "content": ""}}) + "\n").encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in_ollama(token_delay=0.02):
+    """Start the stand-in Ollama server on a free port. Returns (server, host URL)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInOllamaHandler)
+    server.daemon_threads = True
+    server.token_delay = token_delay
+    threading.Thread(target=server.serve_forever, name="stand-in-ollama", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# Threads for resilient FakeZep reads, shared by all replayed turns
+_replay_executor = ThreadPoolExecutor(64, thread_name_prefix="replay-zep")
+
+
+def _replay_turn(trace, host, latency_scale, policy=None, latency_pool=None):
+    """Run one recorded turn through the real agent pipeline against the stand-ins."""
+    is_support_mode = trace["mode"] == "support"
+    zep = FakeZep(trace["zep_calls"], latency_scale, latency_pool)
+    if policy is not None:
+        zep = ResilientZep(zep, policy, _replay_executor)
+    llm = trace.get("llm") or {}
+    completion_tokens = llm.get("completion_tokens") or 1
+    if llm.get("prompt_tokens"):
+        system_chars = max(0, llm["prompt_tokens"] * CHARS_PER_TOKEN - trace["prompt_chars"])
+    else:
+        system_chars = DEFAULT_SYSTEM_CHARS
+    agent = ZepConversableAgent(
+        name="ZEP SUPPORT" if is_support_mode else "ZEP AGENT",
+        system_message="x" * system_chars,
+        llm_config={"config_list": [{
+            "model": f"replay-{completion_tokens}",
+            "api_type": "ollama",
+            "client_host": host,
+        }]},
+        zep_session_id=trace["session"],
+        zep_client=zep,
+        min_fact_rating=0.7,
+        function_map=None,
+        human_input_mode="NEVER",
+        generation_policy=generation_policies[trace["mode"]],
+    )
+    user = UserProxyAgent(
+        name="UserProxy",
+        human_input_mode="NEVER",
+        max_consecutive_auto_reply=0,
+        code_execution_config=False,
+        llm_config=False,
+    )
+
+    start = time.monotonic()
+    run_turn(agent, user, "x" * trace["prompt_chars"], "REPLAY", silent=True)
+    return (time.monotonic() - start) * 1000
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def replay(traces, speed=1.0, latency_scale=1.0, token_delay=0.02, workers=64, resilient=False):
+    """
+    Re-drive recorded turns at their original arrival times divided by speed.
+
+    Args:
+        traces (list): Turn records from load_traces
+        speed (float): Arrival rate multiplier (2.0 = twice as fast)
+        latency_scale (float): Multiplier for recorded Zep latencies
+        token_delay (float): Stand-in Ollama seconds per token
+        workers (int): Maximum concurrent turns
+        resilient (bool): Route Zep reads through ResilientZep, sharing one
+            CallPolicy across turns so it learns the recorded latencies
+
+    Returns:
+        dict: Turn count, errors and p50/p95/p99 turn latency in ms, plus the
+            hedge/retry/timeout counts when resilient
+    """
+    policy = CallPolicy() if resilient else None
+    # Hedged and retried calls draw latencies from the whole trace
+    latency_pool = latency_pool_of((c for t in traces for c in t["zep_calls"]), latency_scale)
+    server, host = start_stand_in_ollama(token_delay)
+    latencies = []
+    errors = 0
+    try:
+        with ThreadPoolExecutor(workers) as pool:
+            start = time.monotonic()
+            first = traces[0]["ts"] if traces else 0
+            futures = []
+            for trace in traces:
+                delay = start + (trace["ts"] - first) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(pool.submit(_replay_turn, trace, host, latency_scale, policy, latency_pool))
+            for future in futures:
+                try:
+                    latencies.append(future.result())
+                except Exception as e:
+                    print(f"Replay turn failed: {e}")
+                    errors += 1
+    finally:
+        server.shutdown()
+
+    summary = {"turns": len(traces), "errors": errors}
+    if latencies:
+        for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            summary[name] = round(percentile(latencies, q), 1)
+    if policy is not None:
+        summary["zep"] = dict(policy.stats)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a captured traffic trace against local stand-ins")
+    parser.add_argument("trace", help="JSONL trace captured with TRAFFIC_CAPTURE")
+    parser.add_argument("--speed", type=float, default=1.0, help="Arrival rate multiplier")
+    parser.add_argument("--zep-latency-scale", type=float, default=1.0)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Stand-in seconds per token")
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--resilient", action="store_true", help="Hedge and time out Zep reads adaptively")
+    args = parser.parse_args()
+
+    print(json.dumps(replay(
+        load_traces(args.trace),
+        speed=args.speed,
+        latency_scale=args.zep_latency_scale,
+        token_delay=args.token_delay,
+        workers=args.workers,
+        resilient=args.resilient,
+    ), indent=2))
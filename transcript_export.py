@@ -0,0 +1,248 @@
+"""
+Streaming export of support ticket transcripts from Zep.
+
+Sessions and messages are paged from Zep and written through generators, so
+memory stays flat regardless of conversation length or ticket count. Up to
+`workers` tickets are fetched concurrently; each one is spooled to a temporary
+file and appended to the output in order. Completed ticket IDs are appended to
+a checkpoint file with the output size after the ticket, so an interrupted
+export truncates anything written after the last checkpoint and resumes there.
+With a .gz output every ticket is its own gzip member, so truncating never
+leaves an unfinished member in the middle of the file.
+
+    ZEP_API_KEY=... python transcript_export.py tickets.md.gz --format markdown
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from zep_cloud.client import Zep
+from util import extract_ticket_info, iter_conversation_history
+
+
+def iter_ticket_sessions(zep, page_size=100):
+    """
+    Yield every support ticket session, oldest first.
+
+    Args:
+        zep: Zep client
+        page_size (int): Sessions fetched per request
+
+    Yields:
+        Session: Zep sessions whose metadata marks them as support tickets
+    """
+    page_number = 1
+    while True:
+        response = zep.memory.list_sessions(
+            page_number=page_number, page_size=page_size, order_by="created_at", asc=True
+        )
+        sessions = response.sessions or []
+        for session in sessions:
+            metadata = session.metadata or {}
+            if "ticket_id" in metadata and metadata.get("issue_type") == "customer_support":
+                yield session
+        if len(sessions) < page_size:
+            return
+        page_number += 1
+
+
+async def a_iter_ticket_sessions(zep, page_size=100):
+    """Async version of iter_ticket_sessions for an AsyncZep client."""
+    page_number = 1
+    while True:
+        response = await zep.memory.list_sessions(
+            page_number=page_number, page_size=page_size, order_by="created_at", asc=True
+        )
+        sessions = response.sessions or []
+        for session in sessions:
+            metadata = session.metadata or {}
+            if "ticket_id" in metadata and metadata.get("issue_type") == "customer_support":
+                yield session
+        if len(sessions) < page_size:
+            return
+        page_number += 1
+
+
+def iter_session_messages(zep, session_id, page_size=100):
+    """
+    Yield the messages of a session as {'role', 'content', 'created_at'} dicts.
+
+    Args:
+        zep: Zep client
+        session_id (str): Session (ticket) ID
+        page_size (int): Messages fetched per request
+
+    Yields:
+        dict: One message at a time, oldest first
+    """
+    cursor = 1
+    while True:
+        response = zep.memory.get_session_messages(session_id, limit=page_size, cursor=cursor)
+        messages = response.messages or []
+        for message in messages:
+            yield {
+                "role": message.role_type,
+                "name": message.role,
+                "content": message.content,
+                "created_at": message.created_at,
+            }
+        if len(messages) < page_size:
+            return
+        cursor += 1
+
+
+def iter_markdown_transcript(ticket, messages):
+    """Yield one ticket's transcript as markdown."""
+    yield f"## Ticket {ticket['ticket_id']}: {ticket['issue_title']}\n\n"
+    yield f"Status: {ticket['status']} | Created: {ticket['created_at']} | Updated: {ticket['last_updated']}\n\n"
+    yield from iter_conversation_history(messages)
+    yield "\n\n"
+
+
+def iter_jsonl_transcript(ticket, messages):
+    """Yield one ticket's transcript as JSON lines, one line per message."""
+    for message in messages:
+        yield json.dumps({"ticket_id": ticket["ticket_id"], **message}) + "\n"
+
+
+FORMATS = {
+    "markdown": iter_markdown_transcript,
+    "jsonl": iter_jsonl_transcript,
+}
+
+
+def read_checkpoint(path):
+    """
+    Read a checkpoint file.
+
+    Returns:
+        tuple: (set of ticket IDs already exported, output size after the last
+            one, or None when unknown)
+    """
+    done, offset = set(), None
+    if not path or not os.path.exists(path):
+        return done, offset
+    with open(path, "r") as f:
+        for line in f:
+            ticket_id, _, size = line.strip().partition("\t")
+            if ticket_id:
+                done.add(ticket_id)
+                offset = int(size) if size else None
+    return done, offset
+
+
+def open_output(path, offset):
+    """
+    Open the export file for binary appends.
+
+    Args:
+        path (str): Export file
+        offset (int): Size to truncate an existing file to; None keeps it whole
+            (checkpoints written before sizes were recorded)
+    """
+    out = open(path, "r+b" if os.path.exists(path) else "wb")
+    if offset is not None:
+        # Drop a ticket that was written (perhaps partly) after the last checkpoint
+        out.truncate(offset)
+    out.seek(0, os.SEEK_END)
+    return out
+
+
+def write_ticket(out, spool, compress):
+    """Append a spooled ticket, as a complete gzip member when compress is set."""
+    if compress:
+        with gzip.GzipFile(fileobj=out, mode="wb") as member:
+            shutil.copyfileobj(spool, member)
+    else:
+        shutil.copyfileobj(spool, out)
+
+
+def _spool_ticket(zep, session, render, page_size):
+    """Fetch and render one ticket into a temporary file."""
+    ticket = extract_ticket_info(session)
+    spool = tempfile.TemporaryFile(mode="w+b")
+    for chunk in render(ticket, iter_session_messages(zep, session.session_id, page_size)):
+        spool.write(chunk.encode("utf-8"))
+    spool.seek(0)
+    return ticket["ticket_id"], spool
+
+
+def export_transcripts(zep, output_path, fmt="markdown", checkpoint_path=None, workers=4, page_size=100):
+    """
+    Export every support ticket transcript to output_path.
+
+    Args:
+        zep: Zep client
+        output_path (str): Destination file (.gz for gzip)
+        fmt (str): 'markdown' or 'jsonl'
+        checkpoint_path (str): File recording exported ticket IDs, enables resume
+        workers (int): Maximum number of tickets fetched concurrently
+        page_size (int): Sessions/messages fetched per Zep request
+
+    Returns:
+        int: Number of tickets exported by this run
+    """
+    render = FORMATS[fmt]
+    done, offset = read_checkpoint(checkpoint_path)
+    compress = output_path.endswith(".gz")
+    exported = 0
+
+    checkpoint = open(checkpoint_path, "a") if checkpoint_path else None
+    try:
+        with open_output(output_path, offset if done else 0) as out, ThreadPoolExecutor(workers) as pool:
+            pending = deque()
+
+            def drain_one():
+                nonlocal exported
+                ticket_id, spool = pending.popleft().result()
+                with spool:
+                    write_ticket(out, spool, compress)
+                out.flush()
+                exported += 1
+                if checkpoint:
+                    checkpoint.write(f"{ticket_id}\t{out.tell()}\n")
+                    checkpoint.flush()
+
+            for session in iter_ticket_sessions(zep, page_size):
+                if session.metadata["ticket_id"] in done:
+                    continue
+                # Keep at most `workers` tickets in flight so memory stays bounded
+                if len(pending) >= workers:
+                    drain_one()
+                pending.append(pool.submit(_spool_ticket, zep, session, render, page_size))
+
+            while pending:
+                drain_one()
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    return exported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export support ticket transcripts from Zep")
+    parser.add_argument("output", help="Output file; use a .gz suffix for gzip")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="markdown")
+    parser.add_argument("--checkpoint", help="Checkpoint file for resuming (default: <output>.checkpoint)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    api_key = os.environ.get("ZEP_API_KEY")
+    if not api_key:
+        parser.error("ZEP_API_KEY environment variable is required")
+
+    count = export_transcripts(
+        Zep(api_key=api_key),
+        args.output,
+        fmt=args.format,
+        checkpoint_path=args.checkpoint or f"{args.output}.checkpoint",
+        workers=args.workers,
+        page_size=args.page_size,
+    )
+    print(f"Exported {count} tickets to {args.output}")
@@ -2,6 +2,8 @@ import hashlib
 import os
 import json
 from datetime import datetime
+from kb_binary import KB_HEADER, KnowledgeBaseImage, render_article
+from kb_watcher import KnowledgeBaseWatcher
 
 
 def generate_user_id(first_name, last_name):
@@ -30,36 +32,136 @@ def generate_user_id(first_name, last_name):
     return f"user_{hashed[:10]}"
 
 
+# Compiled knowledge base, memory-mapped once per version of the file
+_kb_image = None
+# (inode, mtime, size) of the file _kb_image maps
+_kb_image_stat = None
+
+# Rendered support_kb.json and the (mtime, size) it was rendered from
+_kb_json_text = None
+_kb_json_stat = None
+
+# Hot-reload watcher, set by enable_knowledge_base_hot_reload
+_kb_watcher = None
+
+# Compiled knowledge base published by another process, see use_published_knowledge_base
+_kb_published = None
+
+
+def _kb_path(filename):
+    return os.path.join(os.path.dirname(__file__), filename)
+
+
+def enable_knowledge_base_hot_reload(interval=2.0):
+    """
+    Start watching support_kb.json and serve the knowledge base from the watcher.
+    Safe to call on every Streamlit rerun; the watcher is started once per process.
+
+    Args:
+        interval (float): Seconds between file checks
+
+    Returns:
+        KnowledgeBaseWatcher: The running watcher
+    """
+    global _kb_watcher
+    if _kb_watcher is None:
+        _kb_watcher = KnowledgeBaseWatcher(_kb_path("support_kb.json"), interval).start()
+    return _kb_watcher
+
+
+def knowledge_base_snapshot():
+    """Current snapshot of the hot-reloaded knowledge base, or None when hot reload is off."""
+    return _kb_watcher.snapshot if _kb_watcher is not None else None
+
+
+def use_published_knowledge_base(path):
+    """
+    Serve the knowledge base from a compiled file that another process replaces
+    whenever the knowledge base changes (TurnPool workers, see worker_pool.py).
+    A replaced file is remapped on the next load.
+
+    Args:
+        path (str): Compiled knowledge base file
+    """
+    global _kb_published
+    _kb_published = path
+
+
+def _compiled_knowledge_base(kb_file, bin_file):
+    """
+    Return the memory-mapped compiled knowledge base, if it is up to date.
+
+    Args:
+        kb_file (str): Path of the JSON knowledge base, or None to skip the freshness check
+        bin_file (str): Path of the compiled knowledge base
+
+    Returns:
+        KnowledgeBaseImage: Mapped knowledge base, or None
+    """
+    global _kb_image, _kb_image_stat
+    if not os.path.exists(bin_file):
+        return None
+    stat = os.stat(bin_file)
+    # Ignore a compiled file that is older than the JSON source
+    if kb_file and os.path.exists(kb_file) and os.path.getmtime(kb_file) > stat.st_mtime:
+        return None
+
+    # A rebuild replaces the file, so a new inode or mtime means a new mapping
+    identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if _kb_image is None or _kb_image_stat != identity:
+        _kb_image = KnowledgeBaseImage(bin_file)
+        _kb_image_stat = identity
+    return _kb_image
+
+
+def _rendered_json_knowledge_base(kb_file):
+    """Parse and render support_kb.json, once per version of the file."""
+    global _kb_json_text, _kb_json_stat
+    stat = os.stat(kb_file)
+    identity = (stat.st_mtime_ns, stat.st_size)
+    if _kb_json_text is None or _kb_json_stat != identity:
+        with open(kb_file, "r") as f:
+            kb_data = json.load(f)
+
+        # Format knowledge base into readable text
+        _kb_json_text = KB_HEADER + "".join(
+            render_article(article) for article in kb_data.get("articles", [])
+        )
+        _kb_json_stat = identity
+    return _kb_json_text
+
+
 def load_support_knowledge_base():
     """
-    Load the customer support knowledge base from a JSON file.
-    If file doesn't exist, return a default knowledge base.
+    Load the customer support knowledge base.
+    Uses the published knowledge base of use_published_knowledge_base, or the
+    hot-reload watcher's current snapshot when hot reload is enabled, then the compiled support_kb.bin (see kb_binary.py) when it is up to date,
+    otherwise parses support_kb.json. If neither exists, return a default knowledge base.
+    The text is rendered and decoded once per version of the source, so while
+    the knowledge base is unchanged every call returns the same string.
     
     Returns:
         str: Formatted knowledge base content
     """
-    kb_file = os.path.join(os.path.dirname(__file__), "support_kb.json")
+    kb_file = _kb_path("support_kb.json")
+    bin_file = _kb_path("support_kb.bin")
     
     try:
+        if _kb_published is not None:
+            kb_image = _compiled_knowledge_base(None, _kb_published)
+            if kb_image is not None:
+                return kb_image.text() if len(kb_image) else create_default_knowledge_base()
+
+        if _kb_watcher is not None:
+            snapshot = _kb_watcher.snapshot
+            return snapshot.text if snapshot.order else create_default_knowledge_base()
+
+        kb_image = _compiled_knowledge_base(kb_file, bin_file)
+        if kb_image is not None:
+            return kb_image.text()
+
         if os.path.exists(kb_file):
-            with open(kb_file, "r") as f:
-                kb_data = json.load(f)
-                
-            # Format knowledge base into readable text
-            kb_text = "# KNOWLEDGE BASE ARTICLES\n\n"
-            
-            for article in kb_data.get("articles", []):
-                kb_text += f"## {article.get('title', 'Untitled Article')}\n"
-                kb_text += f"ID: {article.get('id', 'unknown')}\n"
-                kb_text += f"{article.get('content', 'No content available')}\n\n"
-                
-                if article.get("solutions"):
-                    kb_text += "### Solutions:\n"
-                    for i, solution in enumerate(article["solutions"], 1):
-                        kb_text += f"{i}. {solution}\n"
-                    kb_text += "\n"
-                    
-            return kb_text
+            return _rendered_json_knowledge_base(kb_file)
         else:
             # Return default knowledge base if file doesn't exist
             return create_default_knowledge_base()
@@ -121,33 +223,51 @@ Guidelines for submitting and tracking feature requests.
     return default_kb
 
 
-def format_conversation_history(messages):
+def iter_conversation_history(messages):
     """
-    Format conversation history into a readable markdown format.
+    Yield the markdown conversation history piece by piece.
+    Works with any iterable of messages, so long conversations can be streamed.
     
     Args:
-        messages (list): List of message dictionaries with 'role' and 'content'
+        messages (iterable): Message dictionaries with 'role' and 'content'
         
-    Returns:
-        str: Formatted conversation history
+    Yields:
+        str: Chunks of the formatted conversation history
     """
-    if not messages:
-        return "No conversation history available."
-        
-    formatted = "# Conversation History\n\n"
+    empty = True
     
-    for i, msg in enumerate(messages, 1):
+    for msg in messages:
+        if empty:
+            yield "# Conversation History\n\n"
+            empty = False
+            
         role = msg.get("role", "unknown")
         content = msg.get("content", "")
         
         if role == "user":
-            formatted += f"**User**: {content}\n\n"
+            yield f"**User**: {content}\n\n"
         elif role == "assistant":
-            formatted += f"**Assistant**: {content}\n\n"
+            yield f"**Assistant**: {content}\n\n"
         else:
-            formatted += f"**{role.capitalize()}**: {content}\n\n"
+            yield f"**{role.capitalize()}**: {content}\n\n"
             
-    return formatted
+    if empty:
+        yield "No conversation history available."
+
+
+def format_conversation_history(messages):
+    """
+    Format conversation history into a readable markdown format.
+    
+    Args:
+        messages (list): List of message dictionaries with 'role' and 'content'
+        
+    Returns:
+        str: Formatted conversation history
+    """
+    if not messages:
+        return "No conversation history available."
+    return "".join(iter_conversation_history(messages))
 
 
 def extract_ticket_info(session):
@@ -0,0 +1,160 @@
+"""
+Process-pool execution mode for conversation turns.
+
+Turns are stateless apart from Zep (agents are rebuilt on every Streamlit
+rerun anyway), so a turn can run in any worker process given the session ID,
+mode, prompt and user name. Workers load the knowledge base the way the app
+does, so with the compiled support_kb.bin (see kb_binary.py) every worker
+memory-maps the same file and the pages are shared through the OS cache
+instead of copied per worker. Each worker builds the system message once per
+knowledge base version.
+
+A turn returns its cleaned response with the agent's generation stats and,
+when the pool records Zep calls for traffic capture, the worker's Zep calls.
+Profiled turns are sampled inside the worker and return the profile's path.
+
+With knowledge base hot reload on, the pool compiles each new snapshot into
+one file of its own, replacing it atomically, and workers remap it on their
+next turn; queued turns simply see the newest version.
+"""
+import atexit
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from autogen import UserProxyAgent
+from zep_cloud.client import Zep
+from llm_config import config_list, generation_policies
+from profiling import profile_turn
+from agent import ZepConversableAgent
+from kb_binary import compile_knowledge_base
+from resilient import ResilientZep
+from support import build_system_message, run_turn
+from traffic import RecordingZep, ZepCallLog
+from util import knowledge_base_snapshot, use_published_knowledge_base
+
+
+# Per-worker Zep client, set up once by _init_worker
+_zep = None
+# Collects the worker's Zep calls per turn when the pool records them
+_zep_calls = ZepCallLog()
+
+
+def _init_worker(api_key, kb_path=None, record_zep_calls=False):
+    """Create the worker's Zep client and point it at the pool's knowledge base, if any."""
+    global _zep
+    _zep = ResilientZep(Zep(api_key=api_key))
+    if record_zep_calls:
+        _zep = RecordingZep(_zep, _zep_calls)
+    if kb_path:
+        use_published_knowledge_base(kb_path)
+
+
+def _worker_turn(
+    session_id, is_support_mode, prompt, user_name, prefetched=None, profile=False, ticket_id=None
+):
+    """
+    Run a single turn inside a worker process, profiling it if profile is set.
+
+    Returns:
+        dict: 'response' (the cleaned response), 'zep_calls' (recorded Zep
+            calls, empty unless the pool records them), 'llm' (the agent's
+            last_generation_stats) and 'profile' (profile path, or None)
+    """
+    agent = ZepConversableAgent(
+        name="ZEP SUPPORT" if is_support_mode else "ZEP AGENT",
+        system_message=build_system_message(is_support_mode),
+        llm_config={"config_list": config_list},
+        zep_session_id=session_id,
+        zep_client=_zep,
+        min_fact_rating=0.7,
+        function_map=None,
+        human_input_mode="NEVER",
+        generation_policy=generation_policies["support" if is_support_mode else "assistant"],
+    )
+    user = UserProxyAgent(
+        name="UserProxy",
+        human_input_mode="NEVER",
+        max_consecutive_auto_reply=0,
+        code_execution_config=False,
+        llm_config=False,
+    )
+    if prefetched is not None:
+        agent.use_prefetched_context(prefetched.memory_context)
+    with profile_turn(session_id, ticket_id, enabled=profile) as profiled, _zep_calls.turn() as zep_calls:
+        response = run_turn(agent, user, prompt, user_name)
+    return {
+        "response": response,
+        "zep_calls": zep_calls,
+        "llm": agent.last_generation_stats,
+        "profile": profiled["path"],
+    }
+
+
+class TurnPool:
+    """
+    Dispatch conversation turns to N worker processes.
+
+    Args:
+        api_key (str): Zep API key used by every worker
+        workers (int): Number of worker processes, defaults to the CPU count
+        record_zep_calls (bool): Return each turn's Zep calls for traffic capture
+    """
+
+    def __init__(self, api_key, workers=None, record_zep_calls=False):
+        # Knowledge base file for the workers, only used with hot reload on
+        self._kb_path = None
+        self._kb_version = None
+        self._kb_lock = threading.Lock()
+        if knowledge_base_snapshot() is not None:
+            self._kb_path = os.path.join(tempfile.gettempdir(), f"zep-kb-{os.getpid()}.bin")
+            self._publish_knowledge_base()
+
+        # spawn avoids forking the Streamlit server and its threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(api_key, self._kb_path, record_zep_calls),
+        )
+        atexit.register(self.shutdown)
+
+    def _publish_knowledge_base(self):
+        """Compile the hot-reloaded knowledge base for the workers if it changed."""
+        if self._kb_path is None:
+            return
+        with self._kb_lock:
+            snapshot = knowledge_base_snapshot()
+            if snapshot.version != self._kb_version:
+                # Reuses the article text the watcher already rendered, and
+                # replaces the file so mapped copies of the old one stay valid
+                compile_knowledge_base(
+                    {"articles": [snapshot.articles[key] for key in snapshot.order]},
+                    self._kb_path,
+                    [snapshot.rendered[key] for key in snapshot.order],
+                )
+                self._kb_version = snapshot.version
+
+    def submit(
+        self, session_id, is_support_mode, prompt, user_name, prefetched=None, profile=False, ticket_id=None
+    ):
+        """Queue a turn and return a Future for its result (see _worker_turn)."""
+        self._publish_knowledge_base()
+        return self._executor.submit(
+            _worker_turn, session_id, is_support_mode, prompt, user_name, prefetched, profile, ticket_id
+        )
+
+    def run(
+        self, session_id, is_support_mode, prompt, user_name, prefetched=None, profile=False, ticket_id=None
+    ):
+        """Run a turn on the pool and wait for its result (see _worker_turn)."""
+        return self.submit(
+            session_id, is_support_mode, prompt, user_name, prefetched, profile, ticket_id
+        ).result()
+
+    def shutdown(self):
+        """Stop the workers and remove the pool's knowledge base file."""
+        self._executor.shutdown(wait=True)
+        if self._kb_path and os.path.exists(self._kb_path):
+            os.remove(self._kb_path)